@@ -0,0 +1,120 @@
+"""Сериализация для API через values().
+
+Модели не создаются и не проверяются: запрос выбирает только нужные
+колонки, связанные объекты из ?include= приходят тем же запросом через
+JOIN, а строки values() перекладываются в словари ответа.
+"""
+from django.core.files.storage import default_storage
+
+
+class Resource:
+    """Описание ресурса API.
+
+    ``fields`` — имя поля в ответе -> путь ORM. ``includes`` — имя связи
+    -> (путь ORM к связи, Resource вложенного объекта); включённая связь
+    заменяет в ответе id связанного объекта самим объектом.
+    """
+
+    def __init__(self, fields, includes=None, files=()):
+        self.fields = fields
+        self.includes = includes or {}
+        self.files = files
+
+    def parse(self, params):
+        """Поля и связи из ?fields= и ?include=; ValueError — неизвестные."""
+        fields = _split(params.get('fields')) or list(self.fields)
+        includes = _split(params.get('include'))
+        unknown = (
+            [name for name in fields if name not in self.fields]
+            + [name for name in includes if name not in self.includes])
+        if unknown:
+            raise ValueError(', '.join(unknown))
+        return fields, includes
+
+    def columns(self, fields, includes):
+        """Выходной ключ -> путь ORM для values()."""
+        columns = {name: self.fields[name] for name in fields}
+        for name in includes:
+            path, nested = self.includes[name]
+            columns.update(
+                (f'{name}.{key}', f'{path}__{value}')
+                for key, value in nested.fields.items())
+        return columns
+
+    def values(self, queryset, fields, includes, extra=()):
+        """queryset.values() с нужными колонками и служебными ``extra``."""
+        columns = self.columns(fields, includes)
+        return queryset.values(*dict.fromkeys([*extra, *columns.values()]))
+
+    def serialize(self, row, fields, includes):
+        columns = self.columns(fields, includes)
+        item = {}
+        for name in fields:
+            item[name] = self._value(name, row[columns[name]])
+        for name in includes:
+            _, nested = self.includes[name]
+            embedded = {
+                key: nested._value(key, row[columns[f'{name}.{key}']])
+                for key in nested.fields
+            }
+            # У поста без группы все колонки группы пустые.
+            item[name] = embedded if embedded.get('id') is not None else None
+        return item
+
+    def _value(self, name, value):
+        if name in self.files:
+            return default_storage.url(value) if value else None
+        return value
+
+
+def _split(value):
+    return [name for name in (value or '').split(',') if name]
+
+
+USER = Resource({
+    'id': 'id',
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+})
+GROUP = Resource({
+    'id': 'id',
+    'title': 'title',
+    'slug': 'slug',
+    'description': 'description',
+    'posts_count': 'posts_count',
+})
+POST = Resource(
+    {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author_id',
+        'group': 'group_id',
+        'image': 'image',
+        'comment_count': 'comment_count',
+    },
+    includes={'author': ('author', USER), 'group': ('group', GROUP)},
+    files=('image',),
+)
+COMMENT = Resource(
+    {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author_id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'parent': 'parent_id',
+        'depth': 'depth',
+    },
+    includes={'author': ('author', USER)},
+)
+FOLLOW = Resource(
+    {
+        'id': 'id',
+        'user': 'user_id',
+        'author': 'author_id',
+        'pub_date': 'pub_date',
+    },
+    includes={'author': ('author', USER)},
+)
@@ -0,0 +1,194 @@
+import gzip
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import search
+from posts.models import (
+    Comment, FeedEntry, Follow, Group, Post, User, UserStats
+)
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='writer', first_name='Лев')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Кошки', slug='cats', description='Про кошек')
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}',
+                group=cls.group if number % 2 else None)
+            for number in range(5)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, name, *args, **params):
+        response = self.client.get(reverse(f'api:{name}', args=args), params)
+        return response, json.loads(response.content)
+
+    @override_settings(API_PAGE_SIZE=2)
+    def test_posts_are_paginated_by_cursor(self):
+        seen = []
+        response, data = self.get('post_list')
+        while True:
+            seen += [item['id'] for item in data['results']]
+            if data['next'] is None:
+                break
+            data = json.loads(self.client.get(data['next']).content)
+        self.assertEqual(
+            seen, [post.pk for post in reversed(self.posts)])
+
+    def test_sparse_fields_and_include(self):
+        response, data = self.get(
+            'post_list', fields='id,text', include='author,group')
+        item = data['results'][0]
+        self.assertEqual(set(item), {'id', 'text', 'author', 'group'})
+        self.assertEqual(item['author']['username'], 'writer')
+        self.assertIsNone(item['group'])
+        self.assertEqual(data['results'][1]['group']['slug'], 'cats')
+
+    def test_list_is_one_query_with_includes(self):
+        with self.assertNumQueries(1):
+            self.get('post_list', include='author,group', limit=100)
+
+    def test_unknown_field_is_400(self):
+        response, data = self.get('post_list', fields='id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', data['error'])
+
+    def test_post_filters_and_detail(self):
+        response, data = self.get('post_list', group='cats')
+        self.assertEqual(len(data['results']), 2)
+        response, data = self.get('post_detail', self.posts[0].pk)
+        self.assertEqual(data['text'], 'Пост 0')
+        self.assertEqual(data['author'], self.author.pk)
+        response, data = self.get('post_detail', 0)
+        self.assertEqual(response.status_code, 404)
+
+    def test_comments(self):
+        response, data = self.get(
+            'comment_list', self.posts[0].pk, include='author')
+        self.assertEqual(
+            [item['author']['username'] for item in data['results']],
+            ['reader'])
+
+    def test_groups(self):
+        response, data = self.get('group_list', fields='slug')
+        self.assertEqual(data['results'], [{'slug': 'cats'}])
+        response, data = self.get('group_detail', 'cats')
+        self.assertEqual(data['posts_count'], 2)
+
+    def test_follows_need_login(self):
+        response, data = self.get('follow_list')
+        self.assertEqual(response.status_code, 401)
+        self.client.force_login(self.reader)
+        response, data = self.get('follow_list', include='author')
+        self.assertEqual(
+            [item['author']['username'] for item in data['results']],
+            ['writer'])
+
+    def test_only_safe_methods(self):
+        response = self.client.post(reverse('api:post_list'))
+        self.assertEqual(response.status_code, 405)
+
+    def test_response_is_gzipped(self):
+        response = self.client.get(
+            reverse('api:post_list'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        data = json.loads(gzip.decompress(response.content))
+        self.assertEqual(len(data['results']), 5)
+
+
+class BatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='bot')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Кошки', slug='cats', description='Про кошек')
+        cls.post = Post.objects.create(author=cls.reader, text='Пост')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def send(self, name, items):
+        response = self.client.post(
+            reverse(f'api:{name}'), json.dumps(items),
+            content_type='application/json')
+        return response, json.loads(response.content)
+
+    def test_posts_are_created_with_derived_data(self):
+        response, data = self.send('post_batch', [
+            {'text': 'Пакетный кот', 'group': self.group.pk},
+            {'text': ''},
+            {'text': 'Пакетный пёс'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((data['created'], data['failed']), (2, 1))
+        self.assertIn('text', data['results'][1]['errors'])
+        ids = [data['results'][0]['id'], data['results'][2]['id']]
+        self.assertEqual(
+            list(Post.objects.filter(pk__in=ids).order_by('pk').values_list(
+                'text', flat=True)),
+            ['Пакетный кот', 'Пакетный пёс'])
+        self.assertEqual(UserStats.for_user(self.author).posts_count, 2)
+        self.assertEqual(
+            Group.objects.get(pk=self.group.pk).posts_count, 1)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(), 2)
+        self.assertEqual(
+            sorted(post.pk for post in search.search('пакетный')[:10]),
+            sorted(ids))
+
+    def test_new_posts_are_visible_on_cached_pages(self):
+        self.client.get(reverse('posts:index'))
+        self.send('post_batch', [{'text': 'Свежий пакетный пост'}])
+        self.assertContains(
+            self.client.get(reverse('posts:index')), 'Свежий пакетный пост')
+
+    def test_comments(self):
+        response, data = self.send('comment_batch', {'items': [
+            {'post': self.post.pk, 'text': 'Первый'},
+            {'post': self.post.pk, 'text': 'Второй'},
+            {'post': 0, 'text': 'Мимо'},
+        ]})
+        self.assertEqual((data['created'], data['failed']), (2, 1))
+        self.assertIn('__all__', data['results'][2]['errors'])
+        self.assertEqual(
+            [Comment.objects.get(pk=data['results'][index]['id']).text
+             for index in (0, 1)],
+            ['Первый', 'Второй'])
+        self.assertEqual(
+            Comment.objects.filter(post=self.post).count(), 2)
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).comment_count, 2)
+
+    def test_all_invalid_is_400(self):
+        response, data = self.send('post_batch', [{'text': ''}, 'пост'])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(data['failed'], 2)
+
+    @override_settings(API_BATCH_LIMIT=2)
+    def test_batch_limit(self):
+        response, data = self.send('post_batch', [{'text': 'пост'}] * 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.filter(author=self.author).exists())
+
+    def test_login_required(self):
+        self.client.logout()
+        response, data = self.send('post_batch', [{'text': 'пост'}])
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,212 @@
+"""JSON API /api/v1/ для мобильных клиентов.
+
+Списки листаются курсором (?cursor=, ?limit=), поля ответа выбираются
+через ?fields=, связанные объекты встраиваются через ?include=. Ответы
+сжимаются gzip или, если установлен пакет brotli, brotli. Пакетные
+POST-запросы создают сразу много постов или комментариев (posts.batch).
+"""
+import json
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.utils.cache import patch_vary_headers
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_POST, require_safe
+
+from posts import batch
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import CursorPaginator
+
+from . import serializers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BROTLI_RE = re.compile(r'\bbr\b')
+
+
+def compressed(view_func):
+    """Сжимает ответ brotli, если клиент его принимает, иначе gzip."""
+    gzipped = gzip_page(view_func)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is None or not BROTLI_RE.search(accept):
+            return gzipped(request, *args, **kwargs)
+        response = view_func(request, *args, **kwargs)
+        # Как GZipMiddleware: короткие ответы сжимать невыгодно.
+        if len(response.content) < 200 or response.has_header(
+                'Content-Encoding'):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        content = brotli.compress(response.content)
+        if len(content) >= len(response.content):
+            return response
+        response.content = content
+        response['Content-Length'] = str(len(content))
+        response['Content-Encoding'] = 'br'
+        return response
+    return wrapper
+
+
+def api_view(view_func):
+    return require_safe(compressed(view_func))
+
+
+def error(status, message):
+    return JsonResponse({'error': message}, status=status)
+
+
+def json_response(data, **kwargs):
+    return JsonResponse(
+        data, json_dumps_params={'ensure_ascii': False}, **kwargs)
+
+
+def page_size(request):
+    try:
+        limit = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        limit = settings.API_PAGE_SIZE
+    return min(max(limit, 1), settings.API_MAX_PAGE_SIZE)
+
+
+def page_link(request, cursor):
+    if cursor is None:
+        return None
+    params = request.GET.copy()
+    params['cursor'] = cursor
+    return f'{request.path}?{params.urlencode()}'
+
+
+def listing(request, resource, queryset, key='pub_date'):
+    """Страница списка по курсору: один запрос на страницу."""
+    try:
+        fields, includes = resource.parse(request.GET)
+    except ValueError as unknown:
+        return error(400, f'Неизвестные поля: {unknown}')
+    rows = resource.values(queryset, fields, includes, extra=('pk', key))
+    paginator = CursorPaginator(rows, page_size(request), key=key)
+    page = paginator.cursor_page(request.GET.get('cursor'))
+    return json_response({
+        'results': [
+            resource.serialize(row, fields, includes) for row in page
+        ],
+        'next': page_link(request, page.next_cursor),
+        'previous': page_link(request, page.previous_cursor),
+    })
+
+
+def detail(request, resource, queryset):
+    try:
+        fields, includes = resource.parse(request.GET)
+    except ValueError as unknown:
+        return error(400, f'Неизвестные поля: {unknown}')
+    row = resource.values(queryset, fields, includes).first()
+    if row is None:
+        return error(404, 'Не найдено.')
+    return json_response(resource.serialize(row, fields, includes))
+
+
+@api_view
+def post_list(request):
+    posts = Post.objects.all()
+    if request.GET.get('group'):
+        posts = posts.filter(group__slug=request.GET['group'])
+    if request.GET.get('author'):
+        posts = posts.filter(author__username=request.GET['author'])
+    return listing(request, serializers.POST, posts)
+
+
+@api_view
+def post_detail(request, post_id):
+    return detail(
+        request, serializers.POST, Post.objects.filter(pk=post_id))
+
+
+@api_view
+def comment_list(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        return error(404, 'Не найдено.')
+    return listing(
+        request, serializers.COMMENT,
+        Comment.objects.filter(post_id=post_id))
+
+
+@api_view
+def group_list(request):
+    """Все группы одной страницей: их немного, курсор не нужен."""
+    resource = serializers.GROUP
+    try:
+        fields, includes = resource.parse(request.GET)
+    except ValueError as unknown:
+        return error(400, f'Неизвестные поля: {unknown}')
+    rows = resource.values(
+        Group.objects.order_by('title'), fields, includes)
+    return json_response({
+        'results': [
+            resource.serialize(row, fields, includes) for row in rows
+        ],
+    })
+
+
+@api_view
+def group_detail(request, slug):
+    return detail(
+        request, serializers.GROUP, Group.objects.filter(slug=slug))
+
+
+@api_view
+def follow_list(request):
+    """Подписки текущего пользователя."""
+    if not request.user.is_authenticated:
+        return error(401, 'Нужно войти на сайт.')
+    return listing(
+        request, serializers.FOLLOW,
+        Follow.objects.filter(user=request.user))
+
+
+def batch_view(create):
+    """View пакетного создания: тело — список объектов или {"items": []}.
+
+    Ответ 201, если созданы все элементы, 200 при частичном успехе и 400,
+    если не создан ни один; в results для каждого элемента его id или
+    ошибки.
+    """
+    @require_POST
+    @compressed
+    @wraps(create)
+    def view(request):
+        if not request.user.is_authenticated:
+            return error(401, 'Нужно войти на сайт.')
+        try:
+            items = json.loads(request.body)
+        except ValueError:
+            return error(400, 'Тело запроса — не JSON.')
+        if isinstance(items, dict):
+            items = items.get('items')
+        if not isinstance(items, list) or not items:
+            return error(400, 'Нужен непустой список объектов.')
+        if len(items) > settings.API_BATCH_LIMIT:
+            return error(
+                400, f'Не больше {settings.API_BATCH_LIMIT} объектов.')
+        results = create(request.user, items)
+        created = sum('id' in result for result in results)
+        if created == len(results):
+            status = 201
+        else:
+            status = 200 if created else 400
+        return json_response({
+            'results': results,
+            'created': created,
+            'failed': len(results) - created,
+        }, status=status)
+    return view
+
+
+post_batch = batch_view(batch.create_posts)
+comment_batch = batch_view(batch.create_comments)
@@ -0,0 +1,257 @@
+"""Кэш в файле SQLite, общий для всех процессов на одном сервере.
+
+В отличие от LocMemCache, воркеры gunicorn видят одни и те же записи.
+Значения сжимаются zlib, при превышении MAX_ENTRIES удаляются сначала
+просроченные, затем самые старые записи. Счётчики попаданий и промахов
+копятся в процессе и периодически сбрасываются в ту же базу, их
+возвращает ``cache.stats()``.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache_entry ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' compressed INTEGER NOT NULL,'
+    ' expires REAL,'
+    ' created REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_entry_created ON cache_entry (created)',
+    'CREATE TABLE IF NOT EXISTS cache_stats ('
+    ' name TEXT PRIMARY KEY,'
+    ' value INTEGER NOT NULL)',
+)
+STATS_FIELDS = ('hits', 'misses', 'sets', 'evictions')
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.location = location
+        self.compress_min_length = int(
+            options.get('COMPRESS_MIN_LENGTH', 1024))
+        self.cull_check_interval = int(
+            options.get('CULL_CHECK_INTERVAL', 50))
+        self.stats_flush_interval = int(
+            options.get('STATS_FLUSH_INTERVAL', 100))
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = dict.fromkeys(STATS_FIELDS, 0)
+        self._writes = 0
+
+    @property
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.location)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(
+                self.location, timeout=30, isolation_level=None,
+                check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in SCHEMA:
+                connection.execute(statement)
+            local.connection = connection
+            local.pid = os.getpid()
+        return local.connection
+
+    def _encode(self, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) >= self.compress_min_length:
+            return zlib.compress(data), 1
+        return data, 0
+
+    @staticmethod
+    def _decode(data, compressed):
+        if compressed:
+            data = zlib.decompress(data)
+        return pickle.loads(data)
+
+    def _count(self, field, amount=1):
+        with self._lock:
+            self._pending[field] += amount
+            flush = sum(self._pending.values()) >= self.stats_flush_interval
+        if flush:
+            self._flush_stats()
+
+    def _flush_stats(self):
+        with self._lock:
+            pending, self._pending = (
+                self._pending, dict.fromkeys(STATS_FIELDS, 0))
+        rows = [(name, value) for name, value in pending.items() if value]
+        if rows:
+            self._connection.executemany(
+                'INSERT INTO cache_stats (name, value) VALUES (?, ?) '
+                'ON CONFLICT(name) DO UPDATE '
+                'SET value = value + excluded.value',
+                rows,
+            )
+
+    def stats(self):
+        """Счётчики всех процессов и число записей — для мониторинга."""
+        self._flush_stats()
+        result = dict.fromkeys(STATS_FIELDS, 0)
+        result.update(self._connection.execute(
+            'SELECT name, value FROM cache_stats').fetchall())
+        result['entries'] = self._connection.execute(
+            'SELECT COUNT(*) FROM cache_entry').fetchone()[0]
+        return result
+
+    def _fetch(self, keys):
+        placeholders = ', '.join('?' * len(keys))
+        rows = self._connection.execute(
+            'SELECT key, value, compressed FROM cache_entry '
+            f'WHERE key IN ({placeholders}) '
+            'AND (expires IS NULL OR expires > ?)',
+            [*keys, time.time()],
+        ).fetchall()
+        return {key: self._decode(value, compressed)
+                for key, value, compressed in rows}
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        found = self._fetch([key])
+        if key in found:
+            self._count('hits')
+            return found[key]
+        self._count('misses')
+        return default
+
+    def get_many(self, keys, version=None):
+        if not keys:
+            return {}
+        made = {self.make_key(key, version=version): key for key in keys}
+        for key in made:
+            self.validate_key(key)
+        found = self._fetch(list(made))
+        self._count('hits', len(found))
+        self._count('misses', len(made) - len(found))
+        return {made[key]: value for key, value in found.items()}
+
+    def _store(self, mode, key, value, timeout):
+        data, compressed = self._encode(value)
+        expires = self.get_backend_timeout(timeout)
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'DELETE FROM cache_entry WHERE key = ? AND expires <= ?',
+                (key, time.time()))
+            cursor = connection.execute(
+                f'INSERT OR {mode} INTO cache_entry '
+                '(key, value, compressed, expires, created) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (key, data, compressed, expires, time.time()),
+            )
+            stored = cursor.rowcount > 0
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        if stored:
+            self._count('sets')
+            self._maybe_cull()
+        return stored
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._store('REPLACE', key, value, timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._store('IGNORE', key, value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        cursor = self._connection.execute(
+            'UPDATE cache_entry SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        )
+        return cursor.rowcount > 0
+
+    def incr(self, key, delta=1, version=None):
+        """Атомарно для всех процессов: чтение и запись в одной транзакции."""
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        connection = self._connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            row = connection.execute(
+                'SELECT value, compressed FROM cache_entry '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (key, time.time()),
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = self._decode(*row) + delta
+            data, compressed = self._encode(value)
+            connection.execute(
+                'UPDATE cache_entry SET value = ?, compressed = ? '
+                'WHERE key = ?', (data, compressed, key))
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        return value
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._connection.execute(
+            'DELETE FROM cache_entry WHERE key = ?', (key,))
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._connection.execute(
+            'SELECT 1 FROM cache_entry '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def clear(self):
+        self._connection.execute('DELETE FROM cache_entry')
+
+    def _maybe_cull(self):
+        with self._lock:
+            self._writes += 1
+            if self._writes % self.cull_check_interval:
+                return
+        connection = self._connection
+        connection.execute(
+            'DELETE FROM cache_entry WHERE expires <= ?', (time.time(),))
+        count = connection.execute(
+            'SELECT COUNT(*) FROM cache_entry').fetchone()[0]
+        if count <= self._max_entries:
+            return
+        # Как в стандартных бэкендах: удаляем 1/CULL_FREQUENCY записей,
+        # а при CULL_FREQUENCY = 0 — все.
+        if self._cull_frequency == 0:
+            excess = count
+        else:
+            excess = max(
+                count - self._max_entries, count // self._cull_frequency)
+        cursor = connection.execute(
+            'DELETE FROM cache_entry WHERE key IN ('
+            ' SELECT key FROM cache_entry ORDER BY created LIMIT ?)',
+            (excess,),
+        )
+        self._count('evictions', cursor.rowcount)
+
+    def close(self, **kwargs):
+        # Соединение живёт весь срок потока, как у FileBasedCache.
+        pass
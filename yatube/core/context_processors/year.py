@@ -1,8 +1,19 @@
 import datetime
 
+_current = {'year': None, 'until': None}
+
+
+def current_year():
+    """Текущий год; пересчитывается только после наступления нового."""
+    today = datetime.date.today()
+    if _current['until'] is None or today >= _current['until']:
+        _current['year'] = today.year
+        _current['until'] = datetime.date(today.year + 1, 1, 1)
+    return _current['year']
+
 
 def year(request):
     """Добавляет переменную с текущим годом."""
     return {
-        'year': datetime.datetime.now().year,
+        'year': current_year(),
     }
@@ -0,0 +1,95 @@
+"""Чтение с реплик, запись в основную базу.
+
+PrimaryReplicaRouter отправляет чтения на случайную исправную реплику из
+settings.DATABASE_REPLICAS, а записи и миграции — в default. После
+собственной записи пользователь какое-то время читает из default, чтобы
+сразу увидеть свой пост или комментарий: ReplicaPinningMiddleware ставит
+для этого cookie на REPLICA_PIN_SECONDS секунд.
+"""
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PIN_COOKIE = 'use_primary'
+
+_pinned = contextvars.ContextVar('use_primary', default=False)
+# Реплика -> (исправна ли, когда проверяли). Своё в каждом процессе.
+_health = {}
+
+
+@contextmanager
+def use_primary():
+    """Все чтения внутри блока идут в основную базу."""
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+def is_healthy(alias):
+    """Проверяет реплику не чаще раза в REPLICA_HEALTH_CHECK_INTERVAL."""
+    healthy, checked = _health.get(alias, (True, None))
+    now = time.monotonic()
+    if (checked is not None
+            and now - checked < settings.REPLICA_HEALTH_CHECK_INTERVAL):
+        return healthy
+    try:
+        with connections[alias].cursor() as cursor:
+            cursor.execute('SELECT 1')
+        healthy = True
+    except DatabaseError:
+        connections[alias].close()
+        healthy = False
+    _health[alias] = (healthy, now)
+    return healthy
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Связанные объекты читаем оттуда же, откуда сам объект.
+            return instance._state.db
+        if _pinned.get() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        replicas = [
+            alias for alias in settings.DATABASE_REPLICAS
+            if is_healthy(alias)
+        ]
+        return random.choice(replicas) if replicas else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinningMiddleware:
+    """Read-your-writes: после POST читаем из основной базы."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writes = request.method not in ('GET', 'HEAD', 'OPTIONS')
+        pinned = _pinned.get() or writes or PIN_COOKIE in request.COOKIES
+        token = _pinned.set(pinned)
+        try:
+            response = self.get_response(request)
+        finally:
+            _pinned.reset(token)
+        if writes and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax')
+        return response
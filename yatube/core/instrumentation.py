@@ -0,0 +1,128 @@
+"""Сбор метрик одного запроса: время, запросы к базе, шаблоны.
+
+RequestMetricsMiddleware создаёт RequestMetrics на каждый запрос и кладёт
+его в contextvar; шаблонный бэкенд и обёртка connection.execute_wrapper
+дописывают туда своё время. Текущий объект возвращает ``current()``.
+"""
+import contextvars
+import time
+from collections import Counter
+
+from django.template.backends.django import DjangoTemplates, Template
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self, sampled):
+        # Число и время запросов к базе считаются всегда, а сами SQL
+        # сохраняются только для выбранных запросов.
+        self.sampled = sampled
+        self.started = time.perf_counter()
+        self.total = 0.0
+        self.db_time = 0.0
+        self.query_count = 0
+        self.template_time = 0.0
+        # Сколько шаблонов рисуется сейчас: время пишет только внешний.
+        self.template_depth = 0
+        self.queries = []
+
+    def duplicates(self):
+        """Запросы, выполненные с теми же SQL и параметрами не раз."""
+        counts = Counter((sql, params) for sql, params, _ in self.queries)
+        return {key: count for key, count in counts.items() if count > 1}
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+
+    def server_timing(self):
+        return ', '.join((
+            f'app;dur={self.total * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};'
+            f'desc="{self.query_count} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+        ))
+
+
+def view_label(request):
+    """Имя view по app_name, например posts:index, или None.
+
+    view_name здесь не годится: posts подключены с namespace 'index'.
+    """
+    match = getattr(request, 'resolver_match', None)
+    if match is None or not match.url_name:
+        return None
+    return ':'.join([*match.app_names, match.url_name])
+
+
+def current():
+    """Метрики текущего запроса или None вне запроса."""
+    return _current.get()
+
+
+def activate(metrics):
+    return _current.set(metrics)
+
+
+def deactivate(token):
+    _current.reset(token)
+
+
+class QueryRecorder:
+    """Обёртка для connection.execute_wrapper()."""
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            metrics = self.metrics
+            metrics.db_time += duration
+            metrics.query_count += 1
+            if metrics.sampled:
+                params = tuple(params) if params and not many else None
+                metrics.queries.append((sql, _hashable(params), duration))
+
+
+def _hashable(params):
+    try:
+        hash(params)
+    except TypeError:
+        return repr(params)
+    return params
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = current()
+        if metrics is None:
+            return super().render(context, request)
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates, учитывающий время отрисовки в метриках запроса.
+
+    Вложенные {% include %} и render_to_string внутри отрисовки (например,
+    карточки posts.cards из тега шаблона) считаются в составе внешнего
+    шаблона, а не ещё раз.
+    """
+
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return InstrumentedTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
@@ -0,0 +1,17 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания, промахи и размер кэша.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alias', default='default')
+
+    def handle(self, *args, **options):
+        cache = caches[options['alias']]
+        if not hasattr(cache, 'stats'):
+            raise CommandError(
+                f'Бэкенд {type(cache).__name__} не ведёт статистику.')
+        for name, value in cache.stats().items():
+            self.stdout.write(f'{name}: {value}')
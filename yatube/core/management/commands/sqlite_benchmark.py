@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sqlite import apply_pragmas
+
+
+def run(path, pragmas, writers, readers, duration):
+    """Пишет и читает одну таблицу из нескольких потоков.
+
+    Возвращает число записей и чтений в секунду и число ошибок
+    ``database is locked``. Каждый поток держит своё соединение, как
+    отдельный воркер сервера.
+    """
+    with sqlite3.connect(path) as connection:
+        apply_pragmas(connection, pragmas)
+        connection.execute(
+            'CREATE TABLE IF NOT EXISTS comment ('
+            'id INTEGER PRIMARY KEY, post_id INTEGER, text TEXT)')
+        connection.execute(
+            'CREATE INDEX IF NOT EXISTS comment_post ON comment (post_id)')
+    counts = {'writes': 0, 'reads': 0, 'locked': 0}
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    # journal_mode хранится в файле базы и уже выставлен выше.
+    per_connection = {
+        name: value for name, value in pragmas.items()
+        if name != 'journal_mode'
+    }
+
+    def worker(write):
+        # Тайм-аут по умолчанию такой же, как у Django: 5 секунд.
+        connection = sqlite3.connect(path, isolation_level=None)
+        apply_pragmas(connection, per_connection)
+        done = locked = 0
+        while time.monotonic() < deadline:
+            try:
+                if write:
+                    connection.execute(
+                        'INSERT INTO comment (post_id, text) VALUES (?, ?)',
+                        (done % 100, 'комментарий' * 10))
+                else:
+                    connection.execute(
+                        'SELECT COUNT(*), MAX(id) FROM comment '
+                        'WHERE post_id = ?', (done % 100,)).fetchone()
+                done += 1
+            except sqlite3.OperationalError:
+                locked += 1
+        connection.close()
+        with lock:
+            counts['writes' if write else 'reads'] += done
+            counts['locked'] += locked
+
+    threads = [
+        threading.Thread(target=worker, args=(index < writers,))
+        for index in range(writers + readers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {
+        'writes_per_second': round(counts['writes'] / duration),
+        'reads_per_second': round(counts['reads'] / duration),
+        'locked_errors': counts['locked'],
+    }
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает конкурентную запись и чтение SQLite с настройками '
+            'по умолчанию и с SQLITE_PRAGMAS.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=4)
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--duration', type=float, default=3)
+
+    def handle(self, *args, **options):
+        modes = {
+            'по умолчанию': {'journal_mode': 'DELETE', 'synchronous': 'FULL'},
+            'SQLITE_PRAGMAS': settings.SQLITE_PRAGMAS,
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            for number, (name, pragmas) in enumerate(modes.items()):
+                result = run(
+                    os.path.join(directory, f'bench{number}.sqlite3'),
+                    pragmas, options['writers'], options['readers'],
+                    options['duration'],
+                )
+                self.stdout.write(
+                    f'{name}: записей/с {result["writes_per_second"]}, '
+                    f'чтений/с {result["reads_per_second"]}, '
+                    f'ошибок блокировки {result["locked_errors"]}')
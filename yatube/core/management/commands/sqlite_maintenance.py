@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.sqlite import maintain
+
+
+class Command(BaseCommand):
+    help = ('Сбрасывает WAL в файл базы SQLite и выполняет PRAGMA optimize; '
+            'с --interval повторяет это периодически.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+        parser.add_argument(
+            '--vacuum', action='store_true',
+            help='Дополнительно пересобрать файл базы (блокирует запись).',
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять раз в столько секунд, пока не остановят.',
+        )
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда нужна только для SQLite.')
+        while True:
+            busy, wal_pages, moved = maintain(
+                connection, vacuum=options['vacuum'])
+            self.stdout.write(
+                f'WAL: страниц {wal_pages}, перенесено {moved}'
+                f'{", база занята" if busy else ""}.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,64 @@
+"""Метрики Prometheus для /metrics.
+
+В одном процессе (runserver, тесты) метрики живут в реестре по
+умолчанию. Под gunicorn задайте переменную окружения
+PROMETHEUS_MULTIPROC_DIR, общую для всех воркеров: каждый процесс пишет
+значения в свои mmap-файлы в этом каталоге, а /metrics суммирует файлы
+всех процессов. Каталог нужно очищать при перезапуске сервера.
+"""
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram,
+    generate_latest, multiprocess
+)
+
+REQUEST_LATENCY = Histogram(
+    'yatube_request_duration_seconds',
+    'Время ответа по имени view.',
+    ['view', 'method'],
+    buckets=(.005, .01, .025, .05, .1, .25, .5, 1, 2.5, 5, 10),
+)
+DB_QUERIES = Counter(
+    'yatube_db_queries_total',
+    'Запросы к базе по имени view.',
+    ['view'],
+)
+DB_DURATION = Counter(
+    'yatube_db_query_seconds_total',
+    'Суммарное время запросов к базе по имени view.',
+    ['view'],
+)
+PAGE_CACHE = Counter(
+    'yatube_page_cache_requests_total',
+    'Обращения к кэшу страниц: hit или miss.',
+    ['view', 'result'],
+)
+THUMBNAIL_DURATION = Histogram(
+    'yatube_thumbnail_generation_seconds',
+    'Время нарезки всех миниатюр одной картинки.',
+    buckets=(.05, .1, .25, .5, 1, 2.5, 5, 10, 30),
+)
+THUMBNAIL_FAILURES = Counter(
+    'yatube_thumbnail_failures_total',
+    'Картинки, которые не удалось нарезать.',
+)
+PAGE_DEPTH = Histogram(
+    'yatube_paginator_page_number',
+    'Номер запрошенной страницы ленты.',
+    ['view'],
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+
+
+def registry():
+    if 'PROMETHEUS_MULTIPROC_DIR' not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def render():
+    """Текст в формате Prometheus и его Content-Type."""
+    return generate_latest(registry()), CONTENT_TYPE_LATEST
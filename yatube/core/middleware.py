@@ -0,0 +1,83 @@
+import json
+import logging
+import random
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import instrumentation
+from .metrics import DB_DURATION, DB_QUERIES, REQUEST_LATENCY
+
+logger = logging.getLogger('yatube.requests')
+slow_logger = logging.getLogger('yatube.requests.slow')
+
+
+class RequestMetricsMiddleware:
+    """Замеряет запрос и пишет результат в Server-Timing и в лог.
+
+    Время запроса, шаблонов и базы считается всегда, а текст SQL
+    сохраняется только для доли REQUEST_METRICS_SAMPLE_RATE запросов.
+    Значения попадают и в метрики Prometheus (core.metrics). Запрос дольше
+    SLOW_REQUEST_THRESHOLD_MS попадает в отдельный лог вместе со списком
+    SQL, если он был выбран для записи.
+
+    Замер заканчивается, когда view вернула ответ. Тело
+    StreamingHttpResponse отдаётся уже после этого, поэтому его время и
+    запросы к базе, сделанные во время отдачи, в метрики не входят.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sampled = random.random() < settings.REQUEST_METRICS_SAMPLE_RATE
+        metrics = instrumentation.RequestMetrics(sampled)
+        token = instrumentation.activate(metrics)
+        try:
+            with ExitStack() as stack:
+                recorder = instrumentation.QueryRecorder(metrics)
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = self.get_response(request)
+            metrics.finish()
+        finally:
+            instrumentation.deactivate(token)
+        if settings.REQUEST_METRICS_SERVER_TIMING:
+            response['Server-Timing'] = metrics.server_timing()
+        self.observe(request, metrics)
+        self.log(request, response, metrics)
+        return response
+
+    def observe(self, request, metrics):
+        view = instrumentation.view_label(request) or 'unresolved'
+        REQUEST_LATENCY.labels(view, request.method).observe(metrics.total)
+        DB_QUERIES.labels(view).inc(metrics.query_count)
+        DB_DURATION.labels(view).inc(metrics.db_time)
+
+    def log(self, request, response, metrics):
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': instrumentation.view_label(request),
+            'status': response.status_code,
+            'total_ms': round(metrics.total * 1000, 1),
+            'db_ms': round(metrics.db_time * 1000, 1),
+            'queries': metrics.query_count,
+            'template_ms': round(metrics.template_time * 1000, 1),
+            'sampled': metrics.sampled,
+        }
+        if metrics.sampled:
+            duplicates = metrics.duplicates()
+            record['duplicate_queries'] = (
+                sum(duplicates.values()) - len(duplicates))
+        logger.info(json.dumps(record, ensure_ascii=False))
+        if metrics.total * 1000 < settings.SLOW_REQUEST_THRESHOLD_MS:
+            return
+        if metrics.sampled:
+            record['sql'] = [
+                {'sql': sql, 'params': repr(params),
+                 'ms': round(duration * 1000, 2)}
+                for sql, params, duration in metrics.queries
+            ]
+        slow_logger.warning(json.dumps(record, ensure_ascii=False))
@@ -0,0 +1,39 @@
+"""Настройки SQLite для работы под нагрузкой.
+
+При каждом новом соединении с SQLite выполняются PRAGMA из
+settings.SQLITE_PRAGMAS: WAL, чтобы читатели не ждали писателей,
+busy_timeout вместо мгновенного ``database is locked``, mmap и кэш
+страниц. Обслуживание WAL-файла и статистики планировщика делает
+``manage.py sqlite_maintenance``.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(cursor, pragmas):
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, settings.SQLITE_PRAGMAS)
+
+
+def maintain(connection, vacuum=False):
+    """Сбрасывает WAL в основной файл и обновляет статистику.
+
+    Возвращает результат wal_checkpoint: (занято, страниц в WAL,
+    перенесено страниц).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        checkpoint = cursor.fetchone()
+        cursor.execute('PRAGMA optimize')
+        if vacuum:
+            cursor.execute('VACUUM')
+    return checkpoint
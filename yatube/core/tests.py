@@ -0,0 +1,249 @@
+import datetime
+import io
+import json
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.http import HttpResponse
+from django.template import engines
+from django.test import (
+    RequestFactory, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings
+)
+
+from core import db, instrumentation
+from core.cache import SQLiteCache
+from core.context_processors import year
+from core.management.commands.sqlite_benchmark import run
+from core.instrumentation import RequestMetrics
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.location = os.path.join(self.directory.name, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def make_cache(self, **options):
+        options.setdefault('CULL_CHECK_INTERVAL', 1)
+        return SQLiteCache(self.location, {'OPTIONS': options})
+
+    def test_values_are_shared_between_instances(self):
+        """Второй экземпляр видит записи первого, как другой воркер."""
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.make_cache().get('key'), {'value': 1})
+
+    def test_large_values_are_compressed(self):
+        value = 'текст ' * 1000
+        self.cache.set('big', value)
+        compressed = self.cache._connection.execute(
+            'SELECT compressed FROM cache_entry').fetchone()[0]
+        self.assertEqual(compressed, 1)
+        self.assertEqual(self.cache.get('big'), value)
+
+    def test_add_incr_and_expiry(self):
+        self.assertTrue(self.cache.add('counter', 1))
+        self.assertFalse(self.cache.add('counter', 5))
+        self.assertEqual(self.make_cache().incr('counter'), 2)
+        self.assertEqual(self.cache.get('counter'), 2)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        self.cache.set('expired', 1, timeout=-1)
+        self.assertIsNone(self.cache.get('expired'))
+        self.assertTrue(self.cache.add('expired', 2))
+
+    def test_oldest_entries_are_evicted(self):
+        cache = self.make_cache(MAX_ENTRIES=10, CULL_FREQUENCY=2)
+        for i in range(12):
+            cache.set(f'key{i}', i)
+        self.assertIsNone(cache.get('key0'))
+        self.assertEqual(cache.get('key11'), 11)
+        self.assertLessEqual(cache.stats()['entries'], 10)
+
+    def test_stats_count_hits_and_misses(self):
+        self.cache.set('key', 1)
+        self.cache.get('key')
+        self.cache.get_many(['key', 'missing'])
+        stats = self.cache.stats()
+        self.assertEqual(stats['hits'], 2)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['entries'], 1)
+
+
+@override_settings(REQUEST_METRICS_SAMPLE_RATE=1.0)
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        response = self.client.get('/')
+        timing = response['Server-Timing']
+        self.assertIn('app;dur=', timing)
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="[1-9]\d* queries"')
+        self.assertRegex(timing, r'tpl;dur=[\d.]+')
+
+    @override_settings(
+        REQUEST_METRICS_SAMPLE_RATE=0.0, SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_unsampled_request_keeps_only_totals(self):
+        with self.assertLogs('yatube.requests.slow', 'WARNING') as logs:
+            self.client.get('/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertGreater(record['queries'], 0)
+        self.assertNotIn('sql', record)
+
+    @override_settings(SLOW_REQUEST_THRESHOLD_MS=0)
+    def test_slow_request_is_logged_with_queries(self):
+        with self.assertLogs('yatube.requests.slow', 'WARNING') as logs:
+            self.client.get('/')
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:index')
+        self.assertEqual(record['queries'], len(record['sql']))
+
+    def test_nested_renders_are_timed_once(self):
+        engine, = engines.all()
+        inner = engine.from_string('карточка')
+        outer = engine.from_string('{{ render }}')
+        metrics = RequestMetrics(sampled=False)
+        token = instrumentation.activate(metrics)
+        try:
+            with mock.patch.object(
+                instrumentation.time, 'perf_counter',
+                side_effect=[0.0, 1.0, 3.0],
+            ):
+                outer.render({'render': lambda: inner.render({})})
+        finally:
+            instrumentation.deactivate(token)
+        # Внешний шаблон шёл с 0.0 до 3.0; вложенный в нём не добавлен.
+        self.assertEqual(metrics.template_time, 3.0)
+
+    def test_duplicates(self):
+        metrics = RequestMetrics(sampled=True)
+        metrics.queries = [
+            ('SELECT %s', (1,), 0.1),
+            ('SELECT %s', (1,), 0.1),
+            ('SELECT %s', (2,), 0.1),
+        ]
+        self.assertEqual(metrics.duplicates(), {('SELECT %s', (1,)): 2})
+
+
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_metrics_include_views_and_page_cache(self):
+        self.client.get('/')
+        self.client.get('/')
+        body = self.client.get('/metrics').content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count'
+            '{method="GET",view="posts:index"}', body)
+        self.assertIn(
+            'yatube_page_cache_requests_total'
+            '{result="hit",view="posts:index"}',
+            body)
+        self.assertIn('yatube_db_queries_total{view="posts:index"}', body)
+        self.assertIn(
+            'yatube_paginator_page_number_count{view="posts:index"}', body)
+
+    def test_metrics_are_closed_for_other_addresses(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = db.PrimaryReplicaRouter()
+        db._health.clear()
+        patcher = mock.patch.object(db, 'is_healthy', return_value=True)
+        self.is_healthy = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_reads_go_to_replica_and_writes_to_primary(self):
+        self.assertEqual(self.router.db_for_read(None), 'replica')
+        self.assertEqual(self.router.db_for_write(None), 'default')
+        self.assertFalse(self.router.allow_migrate('replica', 'posts'))
+
+    def test_pinned_reads_go_to_primary(self):
+        with db.use_primary():
+            self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_unhealthy_replica_is_skipped(self):
+        self.is_healthy.return_value = False
+        self.assertEqual(self.router.db_for_read(None), 'default')
+
+    def test_write_pins_following_reads(self):
+        seen = []
+
+        def view(request):
+            seen.append(self.router.db_for_read(None))
+            return HttpResponse()
+
+        middleware = db.ReplicaPinningMiddleware(view)
+        factory = RequestFactory()
+        response = middleware(factory.post('/create/'))
+        self.assertIn(db.PIN_COOKIE, response.cookies)
+        request = factory.get('/')
+        request.COOKIES[db.PIN_COOKIE] = '1'
+        middleware(request)
+        middleware(factory.get('/'))
+        self.assertEqual(seen, ['default', 'default', 'replica'])
+
+
+class ReplicaHealthTests(SimpleTestCase):
+    def setUp(self):
+        db._health.clear()
+
+    def test_failed_replica_is_not_rechecked_until_interval(self):
+        connection = mock.MagicMock()
+        connection.cursor.side_effect = DatabaseError
+        with mock.patch.object(db, 'connections', {'replica': connection}):
+            self.assertFalse(db.is_healthy('replica'))
+            self.assertFalse(db.is_healthy('replica'))
+        self.assertEqual(connection.cursor.call_count, 1)
+        connection.close.assert_called_once()
+
+
+class SQLiteTuningTests(TransactionTestCase):
+    def test_pragmas_are_applied_to_new_connections(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 5000)
+            cursor.execute('PRAGMA synchronous')
+            # 1 — NORMAL.
+            self.assertEqual(cursor.fetchone()[0], 1)
+
+    def test_maintenance_command(self):
+        out = io.StringIO()
+        call_command('sqlite_maintenance', stdout=out)
+        self.assertIn('WAL:', out.getvalue())
+
+    def test_concurrency_benchmark_uses_wal(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.sqlite3')
+            result = run(path, {'journal_mode': 'WAL'}, 1, 1, 0.2)
+            with sqlite3.connect(path) as bench:
+                mode = bench.execute('PRAGMA journal_mode').fetchone()[0]
+        self.assertEqual(mode, 'wal')
+        self.assertGreater(result['writes_per_second'], 0)
+        self.assertEqual(result['locked_errors'], 0)
+
+
+class YearTests(SimpleTestCase):
+    def test_year_is_recomputed_after_new_year(self):
+        dates = [datetime.date(2025, 12, 31), datetime.date(2026, 1, 1)]
+        with mock.patch.object(year, 'datetime') as fake, \
+                mock.patch.dict(year._current, year=None, until=None):
+            fake.date.side_effect = datetime.date
+            fake.date.today.side_effect = [dates[0], dates[0], dates[1]]
+            self.assertEqual(year.current_year(), 2025)
+            self.assertEqual(year.current_year(), 2025)
+            self.assertEqual(year.year(None), {'year': 2026})
@@ -1,5 +1,9 @@
+from django.conf import settings
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from . import metrics as prometheus
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +19,11 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    """Метрики для Prometheus; доступны только с METRICS_ALLOWED_IPS."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return permission_denied(request, None)
+    body, content_type = prometheus.render()
+    return HttpResponse(body, content_type=content_type)
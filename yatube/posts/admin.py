@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import search
 from .models import Post, Group, Comment, Follow
 
 
@@ -16,6 +17,17 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        # search_fields оставлен для поля поиска в списке, а сам поиск
+        # идёт по полнотекстовому индексу вместо LIKE '%...%'.
+        if search_term and search.is_available():
+            if not search.to_match_query(search_term):
+                # В запросе нет слов: пустой MATCH — ошибка синтаксиса FTS5.
+                return queryset.none(), False
+            return queryset.filter(
+                pk__in=search.matching_ids(search_term)), False
+        return super().get_search_results(request, queryset, search_term)
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
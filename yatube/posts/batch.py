@@ -0,0 +1,119 @@
+"""Пакетное создание постов и комментариев.
+
+Каждый элемент проверяется своей формой (PostForm, CommentForm), а все
+прошедшие проверку вставляются bulk_create в одной транзакции. Сигналы
+post_save при этом не срабатывают, поэтому счётчики, ленты подписок,
+поисковый индекс и поколения кэша обновляются здесь же, одним проходом
+на всю пачку. Результат — список по элементам: id созданной записи или
+ошибки формы.
+"""
+from collections import Counter
+
+from django.db import connection, transaction
+
+from . import cache, feed, search, threads
+from .counters import bump
+from .forms import CommentForm, PostForm
+from .models import Comment, Group, Post, UserStats
+from .signals import comment_scopes, post_scopes
+
+
+def _insert(model, objects):
+    """bulk_create, после которого у объектов есть pk.
+
+    Если база не возвращает id из пакетной вставки (SQLite, MySQL),
+    строки вставляются по одной тем же InsertQuery, что и в Model.save():
+    id берётся из ответа базы, а сигналы post_save не шлются.
+    """
+    if connection.features.can_return_ids_from_bulk_insert:
+        model.objects.bulk_create(objects)
+        return
+    meta = model._meta
+    fields = [
+        field for field in meta.local_concrete_fields
+        if field is not meta.auto_field
+    ]
+    for obj in objects:
+        obj.pk = model._base_manager._insert(
+            [obj], fields=fields, return_id=True)
+        obj._state.adding = False
+        obj._state.db = connection.alias
+
+
+def _validate(items, make_form):
+    """(результаты, [(индекс, форма)]) для корректных элементов."""
+    results = [None] * len(items)
+    valid = []
+    for index, data in enumerate(items):
+        form = make_form(data) if isinstance(data, dict) else None
+        if form is None:
+            results[index] = {'errors': {'__all__': [
+                {'message': 'Ожидался объект.', 'code': 'invalid'}]}}
+        elif form.is_valid():
+            valid.append((index, form))
+        else:
+            results[index] = {'errors': form.errors.get_json_data()}
+    return results, valid
+
+
+def create_posts(author, items):
+    results, valid = _validate(items, lambda data: PostForm(data))
+    posts = []
+    for _, form in valid:
+        post = form.save(commit=False)
+        post.author = author
+        posts.append(post)
+    if posts:
+        with transaction.atomic():
+            _insert(Post, posts)
+            bump(UserStats, author.pk, posts_count=len(posts))
+            groups = Counter(
+                post.group_id for post in posts if post.group_id)
+            for group_id, count in groups.items():
+                bump(Group, group_id, posts_count=count)
+            feed.push_posts(posts)
+            search.index_posts(posts)
+            cache.bump(*{
+                scope for post in posts for scope in post_scopes(post)})
+    for (index, _), post in zip(valid, posts):
+        results[index] = {'id': post.pk}
+    return results
+
+
+def create_comments(author, items):
+    """Элементы — {'post': id, 'text': ...}."""
+    post_ids = {
+        data.get('post') for data in items if isinstance(data, dict)}
+    existing = set(Post.objects.filter(
+        pk__in=[pk for pk in post_ids if isinstance(pk, int)]
+    ).values_list('pk', flat=True))
+
+    def make_form(data):
+        form = CommentForm(data)
+        if data.get('post') not in existing:
+            form.is_valid()
+            form.add_error(None, 'Пост не найден.')
+        return form
+
+    results, valid = _validate(items, make_form)
+    comments = []
+    for _, form in valid:
+        comment = form.save(commit=False)
+        comment.author = author
+        comment.post_id = form.data['post']
+        comments.append(comment)
+    if comments:
+        with transaction.atomic():
+            _insert(Comment, comments)
+            threads.fill_root_paths(Comment.objects.filter(
+                pk__in=[comment.pk for comment in comments]))
+            per_post = Counter(comment.post_id for comment in comments)
+            for post_id, count in per_post.items():
+                bump(Post, post_id, comment_count=count)
+            posts = Post.objects.filter(pk__in=per_post).select_related(
+                'author', 'group')
+            cache.bump(*{
+                scope for post in posts for scope in comment_scopes(post)})
+    for (index, _), comment in zip(valid, comments):
+        results[index] = {'id': comment.pk}
+    return results
@@ -0,0 +1,199 @@
+"""Нагрузочный прогон основных страниц posts.
+
+``seed()`` заполняет базу синтетическими данными Faker через bulk_create,
+``measure()`` гоняет страницы тестовым клиентом и собирает задержки,
+число запросов к базе и пиковую память на запрос. Команда
+``manage.py benchmark`` делает это на отдельной тестовой базе и пишет
+результат в JSON, чтобы сравнивать прогоны разных коммитов.
+"""
+import math
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from datetime import timedelta
+
+import django
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+
+from . import transfer
+from .models import Comment, Follow, Group, Post, User
+
+# measure() очищает кэш перед холодными запросами; свой LocMemCache не
+# даёт ему стереть общий кэш (Redis, memcached) рабочего сайта.
+BENCHMARK_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'benchmark',
+    },
+}
+
+
+def _bulk(model, objects):
+    # Размер пачки выбирает бэкенд: у SQLite он ограничен числом
+    # параметров и членов составного SELECT.
+    with transfer.keep_dates(model):
+        model.objects.bulk_create(objects)
+
+
+def seed(users=100, groups=10, posts=1000, follows_per_user=10,
+         comments_per_post=2, seed=0):
+    """Создаёт воспроизводимый набор данных заданного размера."""
+    faker = Faker('ru_RU')
+    faker.seed_instance(seed)
+    rnd = random.Random(seed)
+    now = timezone.now()
+
+    _bulk(User, [
+        User(username=f'bench{i}', first_name=faker.first_name(),
+             last_name=faker.last_name(), password='!')
+        for i in range(users)
+    ])
+    user_ids = list(User.objects.filter(
+        username__startswith='bench').values_list('pk', flat=True))
+    _bulk(Group, [
+        Group(title=faker.sentence(nb_words=3)[:200], slug=f'bench-{i}',
+              description=faker.paragraph())
+        for i in range(groups)
+    ])
+    group_ids = [None, *Group.objects.filter(
+        slug__startswith='bench-').values_list('pk', flat=True)]
+    _bulk(Post, [
+        Post(author_id=rnd.choice(user_ids), group_id=rnd.choice(group_ids),
+             text=faker.paragraph(nb_sentences=5),
+             pub_date=now - timedelta(minutes=rnd.randrange(525600)))
+        for _ in range(posts)
+    ])
+    follows = set()
+    for user_id in user_ids:
+        authors = rnd.sample(user_ids, min(follows_per_user, len(user_ids)))
+        follows.update(
+            (user_id, author_id) for author_id in authors
+            if author_id != user_id)
+    _bulk(Follow, [
+        Follow(user_id=user_id, author_id=author_id, pub_date=now)
+        for user_id, author_id in follows
+    ])
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    _bulk(Comment, [
+        Comment(post_id=post_id, author_id=rnd.choice(user_ids),
+                text=faker.sentence(), pub_date=now, created=now)
+        for post_id in post_ids
+        for _ in range(comments_per_post)
+    ])
+    transfer.rebuild_derived()
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = math.ceil(percent / 100 * len(ordered)) - 1
+    return ordered[max(rank, 0)]
+
+
+def _targets(rnd):
+    """Имя страницы -> функция, возвращающая (метод, url, данные)."""
+    groups = list(Group.objects.values_list('slug', flat=True))
+    usernames = list(User.objects.values_list('username', flat=True))
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+
+    def get(name, **kwargs):
+        return 'get', reverse(f'posts:{name}', kwargs=kwargs), None
+
+    return {
+        'index': lambda: get('index'),
+        'group_posts': lambda: get('group_list', slug=rnd.choice(groups)),
+        'profile': lambda: get('profile', username=rnd.choice(usernames)),
+        'post_detail': lambda: get(
+            'post_detail', post_id=rnd.choice(post_ids)),
+        'follow_index': lambda: get('follow_index'),
+        'post_create': lambda: (
+            'post', reverse('posts:create'),
+            {'text': f'Пост из бенчмарка {rnd.random()}'},
+        ),
+    }
+
+
+def _request(client, method, url, data):
+    response = getattr(client, method)(url, data)
+    if response.status_code >= 400:
+        raise RuntimeError(f'{url}: HTTP {response.status_code}')
+    return response
+
+
+@override_settings(CACHES=BENCHMARK_CACHES)
+def measure(requests=50, warmup=5, warm_cache=False, views=None, seed=0):
+    """Замеряет страницы; возвращает {страница: метрики}."""
+    rnd = random.Random(seed)
+    viewer = (
+        User.objects.filter(follower__isnull=False).first()
+        or User.objects.first()
+    )
+    client = Client()
+    client.force_login(viewer)
+    results = {}
+    for name, target in _targets(rnd).items():
+        if views and name not in views:
+            continue
+        for _ in range(warmup):
+            _request(client, *target())
+        timings, queries = [], []
+        started = time.perf_counter()
+        for _ in range(requests):
+            request = target()
+            if not warm_cache:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                begin = time.perf_counter()
+                _request(client, *request)
+                timings.append(time.perf_counter() - begin)
+            queries.append(len(captured))
+        elapsed = time.perf_counter() - started
+        # Трассировка памяти замедляет запрос, поэтому пик меряем
+        # отдельным запросом, не входящим в задержки.
+        request = target()
+        if not warm_cache:
+            cache.clear()
+        tracemalloc.start()
+        try:
+            _request(client, *request)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        results[name] = {
+            'requests': requests,
+            'p50_ms': round(percentile(timings, 50) * 1000, 3),
+            'p95_ms': round(percentile(timings, 95) * 1000, 3),
+            'p99_ms': round(percentile(timings, 99) * 1000, 3),
+            'mean_ms': round(sum(timings) / len(timings) * 1000, 3),
+            'rps': round(requests / elapsed, 1),
+            'queries_mean': round(sum(queries) / len(queries), 2),
+            'queries_max': max(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+    return results
+
+
+def environment():
+    """Сведения о прогоне, чтобы результаты можно было сравнивать."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': timezone.now().isoformat(),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'database': connection.vendor,
+    }
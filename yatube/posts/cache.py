@@ -0,0 +1,213 @@
+"""Кэш страниц с версиями по поколениям.
+
+У каждой области данных (вся лента, группа, автор, пост) есть счётчик
+поколения в кэше. Ключ страницы включает поколения её областей, поэтому
+запись в базу, увеличив счётчик, сразу делает старые страницы
+недостижимыми, и срок жизни страниц можно держать большим. Те же
+поколения служат валидатором для условных GET (conditional_versioned).
+Промах кэша сразу после сдвига поколения рендерится из основной базы:
+иначе отстающая реплика положила бы старую страницу под новый ключ.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import (
+    get_cache_key, get_conditional_response, has_vary_header,
+    learn_cache_key, patch_cache_control
+)
+from django.utils.http import http_date, quote_etag
+
+from core.db import use_primary
+from core.instrumentation import view_label
+from core.metrics import PAGE_CACHE
+
+GENERATION_KEY = 'generation:{}'
+# Время последнего сдвига поколения, для заголовка Last-Modified.
+MODIFIED_KEY = 'modified:{}'
+# Область, от которой зависят все страницы: её сдвигают, когда данные
+# меняются в обход сигналов, например после import_data.
+SITE_SCOPE = 'site'
+
+
+def _initial_generation():
+    # Если счётчик вытеснен из кэша, он не должен повторить старое
+    # значение, иначе снова станут видны устаревшие страницы.
+    return time.time_ns()
+
+
+def get_generations(scopes):
+    """Возвращает поколения областей одним обращением к кэшу."""
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    generations = []
+    for key in keys:
+        if key not in found:
+            cache.add(key, _initial_generation(), None)
+            found[key] = cache.get(key)
+        generations.append(found[key])
+    return generations
+
+
+def get_last_modified(scopes):
+    """Время последнего изменения любой из областей, в секундах.
+
+    Если отметка вытеснена из кэша, изменением считается текущий момент.
+    """
+    keys = [MODIFIED_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            cache.add(key, time.time(), None)
+            found[key] = cache.get(key) or time.time()
+    return max(found.values())
+
+
+def _bump(scopes):
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_generation(), None)
+    now = time.time()
+    cache.set_many(
+        {MODIFIED_KEY.format(scope): now for scope in scopes}, None)
+
+
+def bump(*scopes):
+    """Делает устаревшими все страницы, зависящие от областей.
+
+    Внутри транзакции поколение сдвигается ещё раз после коммита: иначе
+    страница, отрисованная по старым данным до коммита, попала бы в кэш
+    уже с новым поколением.
+    """
+    _bump(scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump(scopes))
+
+
+def format_scopes(scopes, kwargs):
+    """Подставляет аргументы view в области.
+
+    Область — строка вида 'group:{slug}' или функция, которая получает
+    аргументы view и возвращает строку, если её не вывести из URL.
+    """
+    return [
+        scope(**kwargs) if callable(scope) else scope.format(**kwargs)
+        for scope in scopes
+    ]
+
+
+def page_key_prefix(request, view_name, scopes):
+    viewer = (
+        f'user{request.user.pk}' if request.user.is_authenticated
+        else 'anon'
+    )
+    generations = '.'.join(
+        str(gen) for gen in get_generations([SITE_SCOPE, *scopes]))
+    return f'{view_name}:{viewer}:{generations}'
+
+
+def cache_versioned(*scopes, timeout=None):
+    """Кэширует GET-ответ view до смены поколения любой из областей.
+
+    Области задаются строками с подстановкой аргументов view, например
+    ``'group:{slug}'``, или функциями (см. format_scopes). Страницы
+    анонимов и каждого пользователя хранятся отдельно; заголовки Vary
+    учитываются как в cache_page.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            page_timeout = (
+                settings.PAGE_CACHE_TIMEOUT if timeout is None else timeout)
+            page_scopes = format_scopes(scopes, kwargs)
+            prefix = page_key_prefix(
+                request, view_func.__name__, page_scopes)
+            cache_key = get_cache_key(request, prefix, 'GET', cache=cache)
+            # Та же метка, что у метрик задержки и SQL (core.middleware).
+            label = view_label(request) or view_func.__name__
+            if cache_key is not None:
+                response = cache.get(cache_key)
+                if response is not None:
+                    PAGE_CACHE.labels(label, 'hit').inc()
+                    return response
+            PAGE_CACHE.labels(label, 'miss').inc()
+            if _recently_modified(page_scopes):
+                # Реплика могла ещё не получить запись, сдвинувшую
+                # поколение, а страница ляжет в кэш уже под новым.
+                with use_primary():
+                    response = view_func(request, *args, **kwargs)
+            else:
+                response = view_func(request, *args, **kwargs)
+            if _is_cacheable(request, response):
+                cache_key = learn_cache_key(
+                    request, response, page_timeout, prefix, cache=cache)
+                cache.set(cache_key, response, page_timeout)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_versioned(*scopes):
+    """Отвечает 304 на условный GET, не вызывая view.
+
+    ETag строится из поколений областей, пользователя и адреса с
+    параметрами, Last-Modified — по времени последнего сдвига поколения.
+    Проверка обходится без запросов к базе и без шаблонов. Ставится
+    снаружи cache_versioned с теми же областями.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            page_scopes = format_scopes(scopes, kwargs)
+            prefix = page_key_prefix(
+                request, view_func.__name__, page_scopes)
+            etag = quote_etag(hashlib.md5(
+                f'{prefix}:{request.get_full_path()}'.encode()).hexdigest())
+            last_modified = int(
+                get_last_modified([SITE_SCOPE, *page_scopes]))
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            if response.status_code not in (200, 304):
+                return response
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            # Браузер должен каждый раз спрашивать сервер: проверка
+            # дешёвая, а страница могла измениться.
+            patch_cache_control(
+                response, no_cache=True,
+                private=request.user.is_authenticated)
+            return response
+        return wrapper
+    return decorator
+
+
+def _recently_modified(scopes):
+    """Сдвигалось ли поколение за время возможного отставания реплик."""
+    if not settings.DATABASE_REPLICAS:
+        return False
+    modified = get_last_modified([SITE_SCOPE, *scopes])
+    return time.time() - modified < settings.REPLICA_PIN_SECONDS
+
+
+def _is_cacheable(request, response):
+    if response.streaming or response.status_code != 200:
+        return False
+    # Как UpdateCacheMiddleware: не сохраняем ответ, который выдаёт
+    # новую cookie (например, CSRF) на запрос без cookie.
+    return not (
+        not request.COOKIES
+        and response.cookies
+        and has_vary_header(response, 'Cookie')
+    )
@@ -0,0 +1,54 @@
+"""Кэш отрисованных карточек постов в списках.
+
+Карточка (автор, дата, картинка, текст, группа, число комментариев)
+одинакова для всех зрителей и меняется редко, а страницы списков
+вытесняются из кэша при каждом новом посте. Поэтому карточка хранится
+отдельно под ключом с поколением области 'post:{id}' (см. posts.cache):
+правка, удаление поста и комментарии сдвигают поколение, и старая
+карточка становится недостижимой. Страница читает все свои карточки
+двумя get_many и отрисовывает только промахи. Части, зависящие от
+зрителя, например кнопка редактирования, в карточку не входят.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core.metrics import PAGE_CACHE
+
+from .cache import SITE_SCOPE, get_generations
+
+CARD_KEY = 'card:{}:{}.{}'
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+
+
+def card_keys(posts):
+    generations = get_generations(
+        [SITE_SCOPE, *(f'post:{post.pk}' for post in posts)])
+    site = generations[0]
+    return [
+        CARD_KEY.format(post.pk, site, generation)
+        for post, generation in zip(posts, generations[1:])
+    ]
+
+
+def render_cards(posts):
+    """Пары (пост, HTML карточки) в порядке постов."""
+    posts = list(posts)
+    if not posts:
+        return []
+    keys = card_keys(posts)
+    found = cache.get_many(keys)
+    missing = {}
+    cards = []
+    for post, key in zip(posts, keys):
+        html = found.get(key)
+        PAGE_CACHE.labels(
+            'post_card', 'miss' if html is None else 'hit').inc()
+        if html is None:
+            html = missing[key] = render_to_string(
+                CARD_TEMPLATE, {'post': post})
+        cards.append((post, mark_safe(html)))
+    if missing:
+        cache.set_many(missing, settings.POST_CARD_CACHE_TIMEOUT)
+    return cards
@@ -0,0 +1,67 @@
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+# Счётчик -> (модель, поле-счётчик, подзапрос с фактическим значением).
+COUNTERS = {
+    'post.comment_count': (Post, 'comment_count', Comment, 'post'),
+    'group.posts_count': (Group, 'posts_count', Post, 'group'),
+    'user.posts_count': (UserStats, 'posts_count', Post, 'author'),
+    'user.followers_count': (UserStats, 'followers_count', Follow, 'author'),
+    'user.following_count': (UserStats, 'following_count', Follow, 'user'),
+}
+
+
+def bump(model, pk, **deltas):
+    """Атомарно меняет счётчики записи выражениями F().
+
+    Счётчик не уходит ниже нуля, даже если он рассинхронизирован
+    (например, после bulk_create), — это исправит rebuild_counters.
+    """
+    updates = {
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    }
+    updated = model.objects.filter(pk=pk).update(**updates)
+    positive = all(delta > 0 for delta in deltas.values())
+    if not updated and positive and model is UserStats:
+        UserStats.objects.get_or_create(user_id=pk)
+        model.objects.filter(pk=pk).update(**updates)
+
+
+def actual_count(source, fk):
+    """Подзапрос с фактическим числом строк source для внешней записи."""
+    rows = source.objects.filter(
+        **{fk: OuterRef('pk')}
+    ).order_by().values(fk).annotate(total=Count('pk'))
+    return Coalesce(Subquery(rows.values('total')), 0)
+
+
+def rebuild_counters():
+    """Пересчитывает все счётчики, по одному UPDATE на счётчик."""
+    with transaction.atomic():
+        missing = User.objects.filter(stats__isnull=True)
+        UserStats.objects.bulk_create(
+            [UserStats(user_id=pk) for pk in missing.values_list(
+                'pk', flat=True)],
+            batch_size=500,
+        )
+        for model, field, source, fk in COUNTERS.values():
+            model.objects.update(**{field: actual_count(source, fk)})
+
+
+def find_mismatches():
+    """Возвращает {счётчик: число записей с неверным значением}."""
+    mismatches = {}
+    for name, (model, field, source, fk) in COUNTERS.items():
+        wrong = model.objects.annotate(
+            actual=actual_count(source, fk)
+        ).exclude(**{field: F('actual')}).count()
+        if wrong:
+            mismatches[name] = wrong
+    if User.objects.filter(stats__isnull=True).exists():
+        mismatches['user.stats'] = User.objects.filter(
+            stats__isnull=True).count()
+    return mismatches
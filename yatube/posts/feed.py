@@ -0,0 +1,156 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+
+from .models import FeedEntry, Follow, Post, UserStats
+
+BATCH_SIZE = 500
+
+
+def is_celebrity(author_id):
+    """Посты таких авторов не раскладываются по лентам подписчиков."""
+    return UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.FEED_FANOUT_LIMIT,
+    ).exists()
+
+
+def push_post(post):
+    """Добавляет новый пост в ленты всех подписчиков автора."""
+    if not settings.FEED_MATERIALIZED or is_celebrity(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True)
+    entries = (
+        FeedEntry(user_id=user_id, post_id=post.pk, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def push_posts(posts):
+    """push_post для многих постов: подписчики автора читаются один раз."""
+    if not settings.FEED_MATERIALIZED:
+        return
+    by_author = defaultdict(list)
+    for post in posts:
+        by_author[post.author_id].append(post)
+    for author_id, author_posts in by_author.items():
+        if is_celebrity(author_id):
+            continue
+        followers = list(Follow.objects.filter(
+            author_id=author_id).values_list('user_id', flat=True))
+        entries = (
+            FeedEntry(user_id=user_id, post_id=post.pk, pub_date=post.pub_date)
+            for user_id in followers
+            for post in author_posts
+        )
+        FeedEntry.objects.bulk_create(
+            entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+
+def _fan_out_author(author_id, user_id=None):
+    """Кладёт все посты автора в ленты его подписчиков (или одного).
+
+    Один INSERT ... SELECT; записи, которые уже есть, пропускаются.
+    """
+    feed = FeedEntry._meta.db_table
+    params = [author_id]
+    only_user = ''
+    if user_id is not None:
+        only_user = 'AND follow.user_id = %s '
+        params.append(user_id)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {feed} (user_id, post_id, pub_date) '
+            'SELECT follow.user_id, post.id, post.pub_date '
+            f'FROM {Follow._meta.db_table} follow '
+            f'JOIN {Post._meta.db_table} post '
+            'ON post.author_id = follow.author_id '
+            f'WHERE follow.author_id = %s {only_user}'
+            f'AND NOT EXISTS (SELECT 1 FROM {feed} entry '
+            'WHERE entry.user_id = follow.user_id '
+            'AND entry.post_id = post.id)',
+            params,
+        )
+
+
+def backfill(user_id, author_id):
+    """Кладёт в ленту все посты автора после подписки."""
+    if not settings.FEED_MATERIALIZED or is_celebrity(author_id):
+        return
+    _fan_out_author(author_id, user_id)
+
+
+def follower_removed(author_id):
+    """Раскладывает посты автора, который перестал быть знаменитостью.
+
+    Пока подписчиков было больше FEED_FANOUT_LIMIT, его посты в ленты не
+    попадали, а follow_feed дочитывал их из Post. Вызывается после того,
+    как счётчик подписчиков уменьшен.
+    """
+    if not settings.FEED_MATERIALIZED:
+        return
+    demoted = UserStats.objects.filter(
+        user_id=author_id,
+        followers_count=settings.FEED_FANOUT_LIMIT,
+    ).exists()
+    if demoted:
+        _fan_out_author(author_id)
+
+
+def trim(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def rebuild():
+    """Собирает все ленты заново одним INSERT ... SELECT.
+
+    Нужна после загрузки данных через bulk_create, когда сигналы не
+    срабатывали; счётчики подписчиков к этому моменту уже должны быть
+    пересчитаны.
+    """
+    with transaction.atomic():
+        FeedEntry.objects.all().delete()
+        if not settings.FEED_MATERIALIZED:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FeedEntry._meta.db_table} '
+                '(user_id, post_id, pub_date) '
+                'SELECT follow.user_id, post.id, post.pub_date '
+                f'FROM {Follow._meta.db_table} follow '
+                f'JOIN {Post._meta.db_table} post '
+                'ON post.author_id = follow.author_id '
+                f'LEFT JOIN {UserStats._meta.db_table} stats '
+                'ON stats.user_id = follow.author_id '
+                'WHERE COALESCE(stats.followers_count, 0) <= %s',
+                [settings.FEED_FANOUT_LIMIT],
+            )
+
+
+def follow_feed(user):
+    """Посты подписок пользователя и ключ для CursorPaginator.
+
+    Обычно это один проход по индексу (user, pub_date) таблицы ленты.
+    Если пользователь подписан на авторов с огромным числом подписчиков,
+    их посты дочитываются при запросе.
+    """
+    posts = Post.objects.feed()
+    if not settings.FEED_MATERIALIZED:
+        return posts.filter(author__following__user=user), 'pub_date'
+    celebrities = Follow.objects.filter(
+        user=user,
+        author__stats__followers_count__gt=settings.FEED_FANOUT_LIMIT,
+    ).values('author')
+    if celebrities.exists():
+        entries = FeedEntry.objects.filter(user=user).values('post')
+        return posts.filter(
+            Q(pk__in=entries) | Q(author__in=celebrities)), 'pub_date'
+    return posts.filter(feed_entries__user=user).annotate(
+        feed_date=F('feed_entries__pub_date')), 'feed_date'
@@ -0,0 +1,108 @@
+"""Граф подписок: подписчики, подписки, взаимные подписки, рекомендации.
+
+Списки листаются курсором по (pub_date, id) подписки и читаются по
+индексам (author, pub_date) и (user, pub_date), поэтому страница стоит
+одинаково и у автора со ста тысячами подписчиков. Числа подписчиков и
+подписок берутся из UserStats, COUNT(*) не выполняется.
+
+Рекомендации «на кого подписаны ваши подписки» считаются заранее
+командой ``manage.py recompute_suggestions`` в таблицу FollowSuggestion:
+один INSERT ... SELECT на пачку пользователей.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Follow, FollowSuggestion
+from .utils import CursorPaginator
+
+
+def followers(author):
+    """Подписки на автора, новые первыми; в каждой загружен user."""
+    return Follow.objects.filter(author=author).select_related('user')
+
+
+def following(user):
+    """Подписки пользователя, новые первыми; в каждой загружен author."""
+    return Follow.objects.filter(user=user).select_related('author')
+
+
+def mutuals(user):
+    """Подписки пользователя на тех, кто подписан на него в ответ."""
+    return following(user).annotate(is_mutual=Exists(Follow.objects.filter(
+        user=OuterRef('author'), author=user))).filter(is_mutual=True)
+
+
+def page(follows, cursor=None, per_page=None):
+    paginator = CursorPaginator(
+        follows, per_page or settings.FOLLOWS_PER_PAGE)
+    return paginator.cursor_page(cursor)
+
+
+def suggestions(user, limit=None):
+    """Рекомендации, без авторов, на которых пользователь уже подписан."""
+    already = Follow.objects.filter(
+        user=user, author=OuterRef('suggested'))
+    return FollowSuggestion.objects.filter(user=user).annotate(
+        followed=Exists(already),
+    ).filter(followed=False).select_related('suggested').order_by(
+        '-score', 'suggested_id')[:limit or settings.FOLLOW_SUGGESTIONS]
+
+
+def _recompute_batch(user_ids, now):
+    follow = Follow._meta.db_table
+    placeholders = ', '.join(['%s'] * len(user_ids))
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user_id__in=user_ids).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {FollowSuggestion._meta.db_table} '
+                '(user_id, suggested_id, score, computed_at) '
+                'SELECT user_id, suggested_id, score, %s FROM ('
+                'SELECT mine.user_id, theirs.author_id AS suggested_id, '
+                'COUNT(*) AS score, ROW_NUMBER() OVER ('
+                'PARTITION BY mine.user_id '
+                'ORDER BY COUNT(*) DESC, theirs.author_id) AS position '
+                f'FROM {follow} mine '
+                f'JOIN {follow} theirs ON theirs.user_id = mine.author_id '
+                f'WHERE mine.user_id IN ({placeholders}) '
+                'AND theirs.author_id <> mine.user_id '
+                f'AND NOT EXISTS (SELECT 1 FROM {follow} already '
+                'WHERE already.user_id = mine.user_id '
+                'AND already.author_id = theirs.author_id) '
+                'GROUP BY mine.user_id, theirs.author_id'
+                ') AS ranked WHERE position <= %s',
+                [
+                    connection.ops.adapt_datetimefield_value(now),
+                    *user_ids,
+                    settings.FOLLOW_SUGGESTIONS,
+                ],
+            )
+            return cursor.rowcount
+
+
+def recompute_suggestions(batch_size=500):
+    """Пересчитывает рекомендации всех, у кого есть подписки.
+
+    Каждая пачка пользователей — своя транзакция; после каждой отдаёт
+    (пользователей, рекомендаций) нарастающим итогом.
+    """
+    now = timezone.now()
+    FollowSuggestion.objects.exclude(
+        user__in=Follow.objects.values('user')).delete()
+    users = Follow.objects.order_by('user_id').values_list(
+        'user_id', flat=True).distinct()
+    batch = []
+    done = created = 0
+    for user_id in users.iterator():
+        batch.append(user_id)
+        if len(batch) == batch_size:
+            created += _recompute_batch(batch, now)
+            done += len(batch)
+            batch = []
+            yield done, created
+    if batch:
+        created += _recompute_batch(batch, now)
+        done += len(batch)
+        yield done, created
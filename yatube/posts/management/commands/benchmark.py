@@ -0,0 +1,89 @@
+import json
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (
+    setup_test_environment, teardown_test_environment
+)
+
+from posts import benchmark
+
+VIEWS = (
+    'index', 'group_posts', 'profile', 'post_detail', 'follow_index',
+    'post_create',
+)
+
+
+class Command(BaseCommand):
+    help = ('Заполняет отдельную тестовую базу синтетическими данными и '
+            'замеряет задержки, запросы к базе и память страниц posts.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument(
+            '--follows-per-user', type=int, default=20,
+            help='Плотность графа подписок.',
+        )
+        parser.add_argument('--comments-per-post', type=int, default=3)
+        parser.add_argument(
+            '--requests', type=int, default=100,
+            help='Замеряемых запросов на страницу.',
+        )
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument(
+            '--warm-cache', action='store_true',
+            help='Не сбрасывать кэш страниц перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--view', action='append', choices=VIEWS, dest='views',
+            help='Замерить только эти страницы; можно указать несколько.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output', '-o', default='benchmark.json',
+            help='Куда записать результаты в JSON.',
+        )
+
+    def handle(self, *args, **options):
+        dataset = {
+            name: options[name] for name in (
+                'users', 'groups', 'posts', 'follows_per_user',
+                'comments_per_post', 'seed',
+            )
+        }
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0)
+        try:
+            self.stdout.write('Заполняем тестовую базу...')
+            benchmark.seed(**dataset)
+            self.stdout.write('Замеряем страницы...')
+            results = benchmark.measure(
+                requests=options['requests'],
+                warmup=options['warmup'],
+                warm_cache=options['warm_cache'],
+                views=options['views'],
+                seed=options['seed'],
+            )
+            report = {
+                'environment': benchmark.environment(),
+                'dataset': dataset,
+                'warm_cache': options['warm_cache'],
+                'views': results,
+            }
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        with open(options['output'], 'w', encoding='utf-8') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        self.stdout.write(
+            f'{"страница":<14}{"p50":>9}{"p95":>9}{"p99":>9}'
+            f'{"запросов":>10}{"память, КБ":>12}')
+        for name, row in results.items():
+            self.stdout.write(
+                f'{name:<14}{row["p50_ms"]:>9}{row["p95_ms"]:>9}'
+                f'{row["p99_ms"]:>9}{row["queries_mean"]:>10}'
+                f'{row["peak_memory_kb"]:>12}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Результаты записаны в {options["output"]}.'))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает пользователей, группы, посты, комментарии или подписки.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(transfer.DATASETS))
+        parser.add_argument(
+            '--output', '-o', default='-',
+            help='Файл для выгрузки, по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS,
+            help='jsonl или csv; по умолчанию по расширению файла.',
+        )
+        parser.add_argument(
+            '--progress-every', type=int, default=10000,
+            help='Как часто сообщать о ходе выгрузки, строк.',
+        )
+
+    def handle(self, *args, **options):
+        dataset, path = options['dataset'], options['output']
+        file_format = options['format'] or transfer.guess_format(path)
+        _, fields = transfer.DATASETS[dataset]
+        stream = (
+            self.stdout if path == '-'
+            else open(path, 'w', encoding='utf-8', newline='')
+        )
+        total = 0
+        try:
+            for total in transfer.write_rows(
+                transfer.export_rows(dataset), stream, file_format, fields
+            ):
+                if total % options['progress_every'] == 0:
+                    self.progress(f'{dataset}: выгружено {total}')
+        finally:
+            if stream is not self.stdout:
+                stream.close()
+        self.progress(f'{dataset}: выгружено строк {total}.')
+
+    def progress(self, message):
+        # stdout может быть занят самими данными.
+        self.stderr.write(message)
@@ -0,0 +1,56 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = ('Загружает пользователей, группы, посты, комментарии или '
+            'подписки из JSONL или CSV.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=list(transfer.DATASETS))
+        parser.add_argument('path', help='Файл с данными, - для stdin.')
+        parser.add_argument(
+            '--format', choices=transfer.FORMATS,
+            help='jsonl или csv; по умолчанию по расширению файла.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Строк в одном bulk_create и одной транзакции.',
+        )
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать строки, которые уже есть в базе.',
+        )
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help=('Не пересобирать счётчики, поиск, ленты и кэш; удобно, '
+                  'если следом загружается ещё один файл.'),
+        )
+
+    def handle(self, *args, **options):
+        dataset, path = options['dataset'], options['path']
+        file_format = options['format'] or transfer.guess_format(path)
+        stream = (
+            sys.stdin if path == '-'
+            else open(path, encoding='utf-8', newline='')
+        )
+        total = 0
+        try:
+            for total in transfer.import_rows(
+                dataset,
+                transfer.read_rows(stream, file_format),
+                options['batch_size'],
+                ignore_conflicts=options['ignore_conflicts'],
+            ):
+                self.stdout.write(f'{dataset}: загружено {total}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        if not options['skip_rebuild']:
+            self.stdout.write('Пересобираем счётчики, поиск и ленты...')
+            transfer.rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(
+            f'{dataset}: загружено строк {total}.'))
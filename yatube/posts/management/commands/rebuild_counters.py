@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.counters import find_mismatches, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и подписок.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только проверить счётчики, ничего не меняя.',
+        )
+
+    def handle(self, *args, **options):
+        if not options['verify']:
+            rebuild_counters()
+            self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны.'))
+        mismatches = find_mismatches()
+        for name, wrong in mismatches.items():
+            self.stdout.write(f'{name}: неверных значений {wrong}')
+        if mismatches:
+            raise CommandError('Счётчики не совпадают с данными.')
+        self.stdout.write(self.style.SUCCESS('Счётчики в порядке.'))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import graph
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации подписок «на кого подписаны ваши '
+            'подписки»; с --interval повторяет это периодически.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Сколько пользователей пересчитывать в одной транзакции.',
+        )
+        parser.add_argument(
+            '--interval', type=float,
+            help='Повторять раз в столько секунд, пока не остановят.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            users = suggestions = 0
+            for users, suggestions in graph.recompute_suggestions(
+                    options['batch_size']):
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Пользователей: {users}')
+            self.stdout.write(
+                f'Пересчитано пользователей: {users}, '
+                f'рекомендаций: {suggestions}.')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
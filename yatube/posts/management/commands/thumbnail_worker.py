@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = 'Нарезает миниатюры картинок постов из очереди ThumbnailJob.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=settings.THUMBNAIL_WORKERS,
+            help='Размер пула потоков.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Сколько задач забирать из очереди за раз.',
+        )
+        parser.add_argument(
+            '--backfill', action='store_true',
+            help='Поставить в очередь картинки всех существующих постов.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Завершиться, когда очередь опустеет.',
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5,
+            help='Пауза между проверками пустой очереди, секунды.',
+        )
+
+    def handle(self, *args, **options):
+        if options['backfill']:
+            thumbnails.enqueue_all()
+        done = failed = 0
+        while True:
+            jobs = thumbnails.claim_jobs(options['batch_size'])
+            if not jobs:
+                if options['once'] or options['backfill']:
+                    break
+                time.sleep(options['interval'])
+                continue
+            failed += thumbnails.process_jobs(jobs, options['workers'])
+            done += len(jobs)
+            self.stdout.write(f'Обработано картинок: {done}, ошибок: {failed}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово: {done} картинок, ошибок: {failed}.'))
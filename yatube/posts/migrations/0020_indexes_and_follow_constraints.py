@@ -0,0 +1,69 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:33
+
+from django.db import migrations, models
+import django.db.models.expressions
+from django.db.models import Count, F, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def remove_invalid_follows(apps, schema_editor):
+    """Удаляет дубли подписок и подписки на себя до ограничений."""
+    Follow = apps.get_model('posts', 'Follow')
+    FeedEntry = apps.get_model('posts', 'FeedEntry')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    # order_by(): иначе Meta.ordering (pub_date) попадёт в GROUP BY.
+    duplicates = Follow.objects.order_by().values('user', 'author').annotate(
+        first=Min('pk'), total=Count('pk')).filter(total__gt=1)
+    removed = 0
+    for row in duplicates.iterator():
+        removed += Follow.objects.filter(
+            user=row['user'], author=row['author'],
+        ).exclude(pk=row['first']).delete()[0]
+    removed += Follow.objects.filter(user=F('author')).delete()[0]
+    if not removed:
+        return
+    FeedEntry.objects.filter(user=F('post__author')).delete()
+
+    def actual(fk):
+        rows = Follow.objects.filter(
+            **{fk: OuterRef('user')}
+        ).order_by().values(fk).annotate(total=Count('pk'))
+        return Coalesce(Subquery(rows.values('total')), 0)
+
+    UserStats.objects.update(
+        followers_count=actual('author'),
+        following_count=actual('user'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0019_post_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_invalid_follows, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-pub_date'], name='comment_post_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='post_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date', '-id'], name='post_group_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(_negated=True, user=django.db.models.expressions.F('author')), name='not_self_follow'),
+        ),
+    ]
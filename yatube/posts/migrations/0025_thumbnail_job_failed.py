@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0024_thumbnail_job_lease'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='thumbnailjob',
+            name='failed',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -1,16 +1,31 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
 from django.db.models import CheckConstraint, UniqueConstraint
 from django.db.models import F, Q
 
 
 User = get_user_model()
 
+# Поля, которые нужны шаблонам ленты; остальные колонки не загружаются.
+FEED_FIELDS = (
+    'text',
+    'pub_date',
+    'image',
+    'comment_count',
+    'author__username',
+    'author__first_name',
+    'author__last_name',
+    'group__title',
+    'group__slug',
+)
+COMMENT_PATH_WIDTH = 10
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
 
     class Meta:
         verbose_name = 'Группа'
@@ -20,7 +35,24 @@ class Group(models.Model):
         return self.title
 
 
-class Post(models.Model):
+class AtomicSaveModel(models.Model):
+    """Сохраняет запись и обновляет счётчики в post_save одной транзакцией."""
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+
+
+class PostQuerySet(models.QuerySet):
+    def feed(self):
+        """Посты для ленты: автор и группа загружаются одним запросом."""
+        return self.select_related('author', 'group').only(*FEED_FIELDS)
+
+
+class Post(AtomicSaveModel):
     text = models.TextField(verbose_name="Текст поста",
                             help_text='Введите текст поста')
     pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
@@ -43,17 +75,30 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True,
     )
+    comment_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ("-pub_date",)
         verbose_name = 'Текст поста'
         verbose_name_plural = "Текст постов"
+        indexes = [
+            # Лента автора и лента группы: фильтр и сортировка CursorPaginator
+            # (-pub_date, -pk) целиком по индексу, без временного B-дерева.
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self) -> str:
         return self.text
 
 
-class Comment(models.Model):
+class Comment(AtomicSaveModel):
     pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
     post = models.ForeignKey(
         Post,
@@ -72,14 +117,65 @@ class Comment(models.Model):
         help_text='Текст нового комментария'
     )
     created = models.DateTimeField(auto_now_add=True)
+    # Ветка ответов хранится материализованным путём: path — id предков
+    # и самого комментария через '/', по COMMENT_PATH_WIDTH цифр. Вся
+    # ветка — это строки с одним root, упорядоченные по path.
+    parent = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name='children',
+        verbose_name='Ответ на'
+    )
+    root = models.ForeignKey(
+        'self',
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        editable=False,
+        related_name='+'
+    )
+    path = models.CharField(max_length=255, default='', editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Комментарий'
         verbose_name_plural = "Комментарии"
+        indexes = [
+            # id в конце: курсор комментариев сортирует по (pub_date, id).
+            models.Index(
+                fields=['post', '-pub_date', '-id'],
+                name='comment_post_pub_date_idx'),
+            models.Index(
+                fields=['post', 'depth', '-pub_date', '-id'],
+                name='comment_top_level_idx'),
+            models.Index(
+                fields=['root', 'path'],
+                name='comment_thread_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        """Новому комментарию проставляет root, depth и path."""
+        creating = self._state.adding
+        if creating and self.parent_id is not None:
+            self.root_id = self.parent.root_id
+            self.depth = self.parent.depth + 1
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
+            if creating:
+                # path включает собственный id, известный только после
+                # INSERT.
+                prefix = f'{self.parent.path}/' if self.parent_id else ''
+                self.path = f'{prefix}{self.pk:0{COMMENT_PATH_WIDTH}d}'
+                if self.root_id is None:
+                    self.root_id = self.pk
+                Comment.objects.filter(pk=self.pk).update(
+                    path=self.path, root_id=self.root_id)
 
 
-class Follow(models.Model):
+class Follow(AtomicSaveModel):
     pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
     user = models.ForeignKey(
         User,
@@ -96,5 +192,111 @@ class Follow(models.Model):
         ordering = ('-pub_date',)
         verbose_name = 'Подписка'
         verbose_name_plural = "Подписки"
-        UniqueConstraint(fields=['author', 'user'], name='unique_follow')
-        CheckConstraint(name='not_same', check=~Q(follower=F('following')))
+        constraints = [
+            # Индекс ограничения обслуживает и поиск подписки (user, author).
+            UniqueConstraint(fields=['user', 'author'], name='unique_follow'),
+            CheckConstraint(
+                check=~Q(user=F('author')), name='not_self_follow'),
+        ]
+        # Списки подписчиков и подписок листаются курсором (posts.graph).
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='follow_author_pub_date_idx'),
+            models.Index(
+                fields=['user', '-pub_date', '-id'],
+                name='follow_user_pub_date_idx'),
+        ]
+
+
+class FollowSuggestion(models.Model):
+    """Кого предложить пользователю: пересчитывается posts.graph."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions'
+    )
+    suggested = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    # Сколько подписок пользователя подписаны на предложенного автора.
+    score = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Рекомендация подписки'
+        verbose_name_plural = 'Рекомендации подписок'
+        constraints = [
+            UniqueConstraint(
+                fields=['user', 'suggested'],
+                name='unique_follow_suggestion'),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-score'], name='suggestion_user_score_idx'),
+        ]
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя, см. posts.signals."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+    @classmethod
+    def for_user(cls, user):
+        return cls.objects.get_or_create(user=user)[0]
+
+
+class FeedEntry(models.Model):
+    """Пост в материализованной ленте подписок пользователя."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            UniqueConstraint(fields=['user', 'post'], name='unique_feed_entry')
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'], name='feed_user_pub_date_idx')
+        ]
+
+
+class ThumbnailJob(models.Model):
+    """Картинка поста, для которой нужно заранее нарезать миниатюры."""
+    image = models.CharField(max_length=255, unique=True)
+    created = models.DateTimeField(auto_now_add=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # Когда задачу забрал воркер; по истечении аренды её заберёт другой.
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    # Попытки исчерпаны: запись остаётся, чтобы картинку не ставили снова.
+    failed = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ('pk',)
+        verbose_name = 'Задача миниатюр'
+        verbose_name_plural = 'Задачи миниатюр'
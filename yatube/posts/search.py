@@ -0,0 +1,177 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite тексты постов лежат в виртуальной таблице FTS5 с rowid, равным
+id поста; сигналы из posts.signals обновляют её вместе с постами.
+Результаты сортируются по bm25 и отдаются с фрагментом текста, где
+подсвечены найденные слова. На других базах и без FTS5 поиск откатывается
+к ``text__icontains``.
+"""
+import re
+from functools import lru_cache
+
+from django.db import connection
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Post
+from .utils import RawSubquery
+
+TABLE = 'posts_post_fts'
+SNIPPET_TOKENS = 24
+# Управляющие символы не встречаются в тексте постов, поэтому снаружи
+# snippet() ими удобно отмечать подсветку и уже после экранирования
+# заменять их на <mark>.
+MARK_START, MARK_END = '\x02', '\x03'
+WORD_RE = re.compile(r'\w+')
+
+
+@lru_cache(maxsize=None)
+def _sqlite_has_fts5():
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def is_available():
+    return connection.vendor == 'sqlite' and _sqlite_has_fts5()
+
+
+def to_match_query(query):
+    """Превращает строку пользователя в запрос MATCH без синтаксиса FTS5.
+
+    Каждое слово ищется по префиксу, все слова обязательны.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD_RE.findall(query.lower()))
+
+
+def index_post(post):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post.pk])
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text],
+        )
+
+
+def index_posts(posts):
+    """index_post для многих постов двумя executemany."""
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {TABLE} WHERE rowid = %s',
+            [[post.pk] for post in posts])
+        cursor.executemany(
+            f'INSERT INTO {TABLE} (rowid, text) VALUES (%s, %s)',
+            [[post.pk, post.text] for post in posts])
+
+
+def unindex_post(post_id):
+    if not is_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE} WHERE rowid = %s', [post_id])
+
+
+def rebuild():
+    """Заполняет индекс заново из posts_post; возвращает число постов."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLE}')
+        cursor.execute(
+            f'INSERT INTO {TABLE} (rowid, text) '
+            'SELECT id, text FROM posts_post'
+        )
+        cursor.execute(f"INSERT INTO {TABLE} ({TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {TABLE}')
+        return cursor.fetchone()[0]
+
+
+def matching_ids(query):
+    """Подзапрос id постов для ``filter(pk__in=...)``, без ранжирования."""
+    return RawSubquery(
+        f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s',
+        [to_match_query(query)],
+    )
+
+
+def highlight(snippet):
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
+
+
+class SearchResults:
+    """Ранжированная выдача, которую можно отдать в Paginator.
+
+    Paginator нужны только ``count()`` и срезы: COUNT(*) и выборка
+    страницы идут отдельными запросами к индексу, посты страницы затем
+    загружаются одним запросом ленты.
+    """
+
+    def __init__(self, query, group=None, author=None):
+        self.match = to_match_query(query)
+        self.where = [f'{TABLE} MATCH %s']
+        self.params = [self.match]
+        if group is not None:
+            self.where.append('post.group_id = %s')
+            self.params.append(group.pk)
+        if author is not None:
+            self.where.append('post.author_id = %s')
+            self.params.append(author.pk)
+
+    def _execute(self, select, select_params=(), suffix='', suffix_params=()):
+        sql = (
+            f'SELECT {select} FROM {TABLE} '
+            f'JOIN posts_post post ON post.id = {TABLE}.rowid '
+            f'WHERE {" AND ".join(self.where)}{suffix}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql, [*select_params, *self.params, *suffix_params])
+            return cursor.fetchall()
+
+    def count(self):
+        if not self.match:
+            return 0
+        return self._execute('COUNT(*)')[0][0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.match:
+            return []
+        start = index.start or 0
+        limit = -1 if index.stop is None else index.stop - start
+        rows = self._execute(
+            f'post.id, snippet({TABLE}, 0, %s, %s, %s, %s)',
+            [MARK_START, MARK_END, '…', SNIPPET_TOKENS],
+            ' ORDER BY rank, post.id DESC LIMIT %s OFFSET %s',
+            [limit, start],
+        ) if limit else []
+        posts = Post.objects.feed().in_bulk([pk for pk, _ in rows])
+        results = []
+        for pk, snippet in rows:
+            post = posts.get(pk)
+            if post is not None:
+                post.snippet = highlight(snippet)
+                results.append(post)
+        return results
+
+
+def search(query, group=None, author=None):
+    """Возвращает посты по запросу, самые подходящие первыми."""
+    if is_available():
+        return SearchResults(query, group=group, author=author)
+    posts = Post.objects.feed().filter(text__icontains=query)
+    if group is not None:
+        posts = posts.filter(group=group)
+    if author is not None:
+        posts = posts.filter(author=author)
+    return posts
@@ -0,0 +1,158 @@
+from django.db.models.signals import (
+    post_delete, post_init, post_save, pre_save
+)
+from django.dispatch import receiver
+
+from . import cache, feed, search
+from .counters import bump
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_init, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    # Нужна при смене группы в post_edit; deferred-поле не загружаем.
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        bump(UserStats, instance.author_id, posts_count=1)
+    elif instance._loaded_group_id == instance.group_id:
+        return
+    elif instance._loaded_group_id is not None:
+        bump(Group, instance._loaded_group_id, posts_count=-1)
+    if instance.group_id is not None:
+        bump(Group, instance.group_id, posts_count=1)
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    bump(UserStats, instance.author_id, posts_count=-1)
+    if instance.group_id is not None:
+        bump(Group, instance.group_id, posts_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        bump(Post, instance.post_id, comment_count=1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    bump(Post, instance.post_id, comment_count=-1)
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        bump(UserStats, instance.user_id, following_count=1)
+        bump(UserStats, instance.author_id, followers_count=1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    bump(UserStats, instance.user_id, following_count=-1)
+    bump(UserStats, instance.author_id, followers_count=-1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.push_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_feed(sender, instance, **kwargs):
+    feed.trim(instance.user_id, instance.author_id)
+    # count_deleted_follow подключён выше и уже уменьшил счётчик.
+    feed.follower_removed(instance.author_id)
+
+
+@receiver(post_save, sender=Post)
+def index_saved_post(sender, instance, update_fields=None, **kwargs):
+    # Фикстуры (raw) индексируем тоже: поиск должен видеть их посты.
+    if update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_deleted_post(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+def post_scopes(post):
+    scopes = ['feed', f'post:{post.pk}', f'author:{post.author.username}']
+    if post.group_id is not None:
+        scopes.append(f'group:{post.group.slug}')
+    return scopes
+
+
+def comment_scopes(post):
+    """Области, которые сбрасывает комментарий к посту.
+
+    Главная ('feed') общая для всего сайта и не сбрасывается на каждый
+    комментарий: число комментариев на ней обновится, когда страница
+    будет отрисована заново, из карточки с новым поколением поста.
+    """
+    return [scope for scope in post_scopes(post) if scope != 'feed']
+
+
+@receiver(pre_save, sender=Post)
+def invalidate_old_group_pages(sender, instance, raw=False, **kwargs):
+    loaded_group_id = getattr(instance, '_loaded_group_id', None)
+    if raw or loaded_group_id in (None, instance.group_id):
+        return
+    slug = Group.objects.filter(pk=loaded_group_id).values_list(
+        'slug', flat=True).first()
+    if slug is not None:
+        cache.bump(f'group:{slug}')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        cache.bump(*post_scopes(instance))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, raw=False, **kwargs):
+    # Число комментариев видно и в карточке поста на страницах списков.
+    if raw:
+        return
+    try:
+        post = instance.post
+    except Post.DoesNotExist:
+        cache.bump(f'post:{instance.post_id}')
+    else:
+        cache.bump(*comment_scopes(post))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_pages(sender, instance, raw=False, **kwargs):
+    if not raw:
+        # Профиль подписчика тоже показывает число его подписок.
+        cache.bump(
+            f'author:{instance.author.username}',
+            f'author:{instance.user.username}',
+            f'follows:{instance.user_id}',
+        )
@@ -0,0 +1,248 @@
+"""Ленты Atom, RSS и JSON Feed для программ, опрашивающих сайт.
+
+Лента есть у всего сайта, у группы, у автора и у подписок пользователя;
+для подписок адрес содержит подписанный токен вместо входа на сайт.
+Ответ собирается генератором по мере чтения постов из базы, поэтому
+лента любой длины не держится в памяти целиком. ETag и Last-Modified
+считаются по дате последнего поста и поколениям кэша (posts.cache), так
+что повторный опрос без изменений стоит одного запроса к базе и отдаёт
+304.
+"""
+import hashlib
+import json
+from xml.sax.saxutils import escape, quoteattr
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Max
+from django.http import Http404, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import rfc2822_date, rfc3339_date
+from django.views.decorators.http import condition
+
+from . import cache
+from .feed import follow_feed
+from .models import Group, Post, User
+
+FORMATS = {
+    'atom': 'application/atom+xml; charset=utf-8',
+    'rss': 'application/rss+xml; charset=utf-8',
+    'json': 'application/feed+json; charset=utf-8',
+}
+TOKEN_SALT = 'posts.syndication.follow'
+CHUNK_SIZE = 100
+
+
+class FormatConverter:
+    """Конвертер пути для расширения ленты: atom, rss или json."""
+    regex = '|'.join(FORMATS)
+
+    def to_python(self, value):
+        return value
+
+    def to_url(self, value):
+        return value
+
+
+def follow_token(user):
+    """Токен адреса ленты подписок; не меняется, пока жив SECRET_KEY."""
+    return signing.Signer(salt=TOKEN_SALT).sign(str(user.pk))
+
+
+def user_for_token(token):
+    try:
+        pk = signing.Signer(salt=TOKEN_SALT).unsign(token)
+    except signing.BadSignature:
+        raise Http404('Неверный токен ленты.')
+    return get_object_or_404(User, pk=pk)
+
+
+class Feed:
+    """Что показать в ленте: заголовок, адрес страницы, посты, области."""
+
+    def __init__(self, title, link, posts, scopes):
+        self.title = title
+        self.link = link
+        self.posts = posts
+        self.scopes = scopes
+        self._validators = None
+
+    def validators(self, fmt):
+        """(ETag, дата последнего поста); считается один раз."""
+        if self._validators is None:
+            latest = self.posts.aggregate(latest=Max('pub_date'))['latest']
+            generations = cache.get_generations(
+                [cache.SITE_SCOPE, *self.scopes])
+            self._validators = (latest, generations)
+        latest, generations = self._validators
+        digest = hashlib.md5(
+            f'{fmt}:{latest}:{generations}'.encode()).hexdigest()
+        return f'"{digest}"', latest
+
+    def items(self):
+        posts = self.posts.order_by('-pub_date', '-pk')
+        return posts[:settings.SYNDICATION_ITEMS].iterator(CHUNK_SIZE)
+
+
+def _title(post):
+    return post.text[:settings.SYNDICATION_TITLE_LENGTH]
+
+
+def _author(post):
+    return post.author.get_full_name() or post.author.username
+
+
+def atom(request, feed):
+    url = request.build_absolute_uri
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom">'
+        f'<title>{escape(feed.title)}</title>'
+        f'<link href={quoteattr(url(feed.link))} rel="alternate"/>'
+        f'<link href={quoteattr(url())} rel="self"/>'
+        f'<id>{escape(url(feed.link))}</id>'
+    )
+    _, latest = feed.validators('atom')
+    if latest is not None:
+        yield f'<updated>{rfc3339_date(latest)}</updated>'
+    for post in feed.items():
+        link = url(reverse('posts:post_detail', args=[post.pk]))
+        yield (
+            '<entry>'
+            f'<title>{escape(_title(post))}</title>'
+            f'<link href={quoteattr(link)} rel="alternate"/>'
+            f'<id>{escape(link)}</id>'
+            f'<published>{rfc3339_date(post.pub_date)}</published>'
+            f'<updated>{rfc3339_date(post.pub_date)}</updated>'
+            f'<author><name>{escape(_author(post))}</name></author>'
+            f'<content type="text">{escape(post.text)}</content>'
+            '</entry>'
+        )
+    yield '</feed>\n'
+
+
+def rss(request, feed):
+    url = request.build_absolute_uri
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/">'
+        '<channel>'
+        f'<title>{escape(feed.title)}</title>'
+        f'<link>{escape(url(feed.link))}</link>'
+        f'<description>{escape(feed.title)}</description>'
+    )
+    _, latest = feed.validators('rss')
+    if latest is not None:
+        yield f'<lastBuildDate>{rfc2822_date(latest)}</lastBuildDate>'
+    for post in feed.items():
+        link = url(reverse('posts:post_detail', args=[post.pk]))
+        yield (
+            '<item>'
+            f'<title>{escape(_title(post))}</title>'
+            f'<link>{escape(link)}</link>'
+            f'<guid isPermaLink="true">{escape(link)}</guid>'
+            f'<pubDate>{rfc2822_date(post.pub_date)}</pubDate>'
+            # В <author> RSS ждёт e-mail, поэтому имя пишем в dc:creator.
+            f'<dc:creator>{escape(_author(post))}</dc:creator>'
+            f'<description>{escape(post.text)}</description>'
+            '</item>'
+        )
+    yield '</channel></rss>\n'
+
+
+def json_feed(request, feed):
+    url = request.build_absolute_uri
+    head = json.dumps({
+        'version': 'https://jsonfeed.org/version/1.1',
+        'title': feed.title,
+        'home_page_url': url(feed.link),
+        'feed_url': url(),
+    }, ensure_ascii=False)
+    # Шапка без закрывающей скобки: элементы дописываются по одному.
+    yield head[:-1] + ', "items": ['
+    for number, post in enumerate(feed.items()):
+        item = {
+            'id': str(post.pk),
+            'url': url(reverse('posts:post_detail', args=[post.pk])),
+            'title': _title(post),
+            'content_text': post.text,
+            'date_published': rfc3339_date(post.pub_date),
+            'authors': [{
+                'name': _author(post),
+                'url': url(reverse('posts:profile', args=[
+                    post.author.username])),
+            }],
+        }
+        if post.image:
+            item['image'] = url(post.image.url)
+        if post.group_id is not None:
+            item['tags'] = [post.group.slug]
+        yield (', ' if number else '') + json.dumps(item, ensure_ascii=False)
+    yield ']}\n'
+
+
+RENDERERS = {'atom': atom, 'rss': rss, 'json': json_feed}
+
+
+def syndication_view(get_feed):
+    """Делает из функции, возвращающей Feed, view ленты.
+
+    Feed сохраняется в request, чтобы проверка условий и сам ответ
+    строились по одному и тому же набору постов.
+    """
+    def feed_for(request, fmt, **kwargs):
+        if not hasattr(request, 'syndication_feed'):
+            request.syndication_feed = get_feed(request, **kwargs)
+        return request.syndication_feed
+
+    def etag(request, fmt, **kwargs):
+        return feed_for(request, fmt, **kwargs).validators(fmt)[0]
+
+    def last_modified(request, fmt, **kwargs):
+        return feed_for(request, fmt, **kwargs).validators(fmt)[1]
+
+    @condition(etag_func=etag, last_modified_func=last_modified)
+    def view(request, fmt, **kwargs):
+        feed = feed_for(request, fmt, **kwargs)
+        return StreamingHttpResponse(
+            RENDERERS[fmt](request, feed), content_type=FORMATS[fmt])
+
+    view.__name__ = get_feed.__name__
+    view.__doc__ = get_feed.__doc__
+    return view
+
+
+@syndication_view
+def index_feed(request):
+    """Все посты сайта."""
+    return Feed('Последние обновления на сайте', reverse('posts:index'),
+                Post.objects.feed(), ['feed'])
+
+
+@syndication_view
+def group_feed(request, slug):
+    """Посты группы."""
+    group = get_object_or_404(Group, slug=slug)
+    return Feed(f'Записи сообщества {group.title}',
+                reverse('posts:group_list', args=[slug]),
+                group.posts.feed(), [f'group:{slug}'])
+
+
+@syndication_view
+def profile_feed(request, username):
+    """Посты автора."""
+    author = get_object_or_404(User, username=username)
+    return Feed(f'Профайл пользователя {author.get_full_name() or username}',
+                reverse('posts:profile', args=[username]),
+                author.posts.feed(), [f'author:{username}'])
+
+
+@syndication_view
+def subscription_feed(request, token):
+    """Посты подписок владельца токена."""
+    user = user_for_token(token)
+    posts, _ = follow_feed(user)
+    # Лента подписок меняется с любым постом и с подписками владельца.
+    return Feed('Все посты ваших подписок', reverse('posts:follow_index'),
+                posts, ['feed', f'follows:{user.pk}'])
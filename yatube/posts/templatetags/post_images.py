@@ -0,0 +1,58 @@
+import logging
+
+from django import template
+from posts import thumbnails
+
+register = template.Library()
+logger = logging.getLogger(__name__)
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def post_picture(image, geometry, sizes='100vw', **options):
+    """Выводит <picture> с WebP и srcset вместо одной большой миниатюры.
+
+    Принимает те же геометрию и опции, что и {% thumbnail %}, например
+    {% post_picture post.image "1960x339" crop="center" upscale=True %}.
+    Берёт только миниатюры, уже нарезанные воркером (posts.thumbnails).
+    Если каких-то нет, картинка ставится в очередь, а пока без них
+    обходится srcset; без единой миниатюры выводится исходник.
+    """
+    if not image:
+        return {}
+    sources = {}
+    missing = False
+    try:
+        for image_format, width, scaled, variant in thumbnails.variants(
+            geometry, options
+        ):
+            thumbnail = thumbnails.cached_thumbnail(image, scaled, **variant)
+            if thumbnail is None:
+                missing = True
+                continue
+            sources.setdefault(image_format, []).append(
+                (thumbnail, f'{thumbnail.url} {width}w'))
+        if missing:
+            thumbnails.enqueue(image)
+    except Exception:
+        # Как тег {% thumbnail %}: битая картинка не должна ронять страницу.
+        logger.exception('Не удалось получить миниатюры %s', image)
+        return {}
+    fallback = sources.pop(None, None)
+    if not fallback:
+        return {'image': image, 'sizes': sizes}
+    # Если sorl не смог нарезать миниатюру, размер у неё неизвестен.
+    width, height = fallback[-1][0].size or (None, None)
+    return {
+        'sources': [
+            {
+                'type': f'image/{image_format.lower()}',
+                'srcset': ', '.join(item for _, item in items),
+            }
+            for image_format, items in sources.items()
+        ],
+        'image': fallback[-1][0],
+        'srcset': ', '.join(item for _, item in fallback),
+        'width': width,
+        'height': height,
+        'sizes': sizes,
+    }
@@ -0,0 +1,15 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def owns(viewer, obj):
+    """{% if viewer|owns:post %}: зритель — автор поста или комментария."""
+    return viewer.owns(obj)
+
+
+@register.filter
+def follows(viewer, author):
+    """{% if viewer|follows:post.author_id %}: без запроса на каждый пост."""
+    return viewer.follows(author)
@@ -0,0 +1,33 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from posts import benchmark
+from posts.models import Comment, FeedEntry, Post, User
+
+
+class BenchmarkTests(TestCase):
+    def test_seed_and_measure(self):
+        benchmark.seed(users=5, groups=2, posts=20, follows_per_user=2,
+                       comments_per_post=1)
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 20)
+        self.assertEqual(Comment.objects.count(), 20)
+        self.assertTrue(FeedEntry.objects.exists())
+
+        cache.set('shared', 'value')
+        results = benchmark.measure(requests=3, warmup=1)
+        # Холодные прогоны чистят только кэш бенчмарка.
+        self.assertEqual(cache.get('shared'), 'value')
+        self.assertEqual(set(results), {
+            'index', 'group_posts', 'profile', 'post_detail',
+            'follow_index', 'post_create',
+        })
+        for row in results.values():
+            self.assertLessEqual(row['p50_ms'], row['p99_ms'])
+            self.assertGreater(row['queries_mean'], 0)
+
+    def test_percentile_uses_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
@@ -0,0 +1,121 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import cache as page_cache
+from posts.models import Comment, Group, Post, User
+
+
+class VersionedPageCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='cached_author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='cached', description='Описание')
+        cls.post = Post.objects.create(
+            text='Первый пост', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.author)
+
+    def test_group_page_shows_new_post_immediately(self):
+        url = reverse('posts:group_list', kwargs={'slug': 'cached'})
+        self.guest_client.get(url)
+        Post.objects.create(
+            text='Свежий пост', author=self.author, group=self.group)
+        self.assertContains(self.guest_client.get(url), 'Свежий пост')
+
+    def test_comment_invalidates_post_detail(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            self.guest_client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Новый комментарий')
+        self.assertContains(self.guest_client.get(url), 'Новый комментарий')
+
+    def test_new_post_updates_author_count_on_post_detail(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        response = self.guest_client.get(url)
+        self.assertEqual(response.context['number_of_posts'], 1)
+        etag = response['ETag']
+        Post.objects.create(text='Второй пост', author=self.author)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['number_of_posts'], 2)
+
+    def test_anonymous_and_authorized_pages_are_separate(self):
+        url = reverse('posts:index')
+        self.authorized_client.get(url)
+        response = self.guest_client.get(url)
+        self.assertNotContains(response, 'Пользователь: cached_author')
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_miss_after_bump_is_rendered_from_primary(self):
+        url = reverse('posts:index')
+        with mock.patch.object(page_cache, 'use_primary') as use_primary:
+            cache.set_many({
+                page_cache.MODIFIED_KEY.format(scope): time.time() - 3600
+                for scope in (page_cache.SITE_SCOPE, 'feed')
+            }, None)
+            self.guest_client.get(url)
+            use_primary.assert_not_called()
+            page_cache.bump('feed')
+            self.guest_client.get(url)
+            use_primary.assert_called_once()
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='etag_author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='etag', description='Описание')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_unchanged_page_is_not_modified_without_rendering(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        response = self.client.get(url)
+        self.assertIn('no-cache', response['Cache-Control'])
+        with self.assertNumQueries(0), \
+                self.assertTemplateNotUsed('posts/post_detail.html'):
+            response = self.client.get(
+                url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_if_modified_since(self):
+        url = reverse('posts:profile', kwargs={'username': 'etag_author'})
+        last_modified = self.client.get(url)['Last-Modified']
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+    def test_comment_changes_etag(self):
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Комментарий')
+
+    def test_etag_depends_on_viewer_and_page(self):
+        url = reverse('posts:group_list', kwargs={'slug': 'etag'})
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(self.client.get(url, {'page': 2})['ETag'], etag)
+        self.client.force_login(self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('private', response['Cache-Control'])
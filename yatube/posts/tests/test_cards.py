@@ -0,0 +1,95 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import cards
+from posts.cache import bump, get_generations
+from posts.models import Comment, Group, Post, User
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def rendered(self):
+        """Сколько карточек отрисовано при загрузке главной страницы."""
+        with mock.patch.object(
+                cards, 'render_to_string', wraps=render_to_string) as render:
+            response = self.client.get(reverse('posts:index'))
+        return response, render.call_count
+
+    def test_new_post_renders_only_its_card(self):
+        self.assertEqual(self.rendered()[1], 3)
+        Post.objects.create(author=self.author, text='Новый пост')
+        response, count = self.rendered()
+        self.assertEqual(count, 1)
+        self.assertContains(response, 'Новый пост')
+        self.assertContains(response, 'Пост 0')
+
+    def test_edit_and_comment_invalidate_card(self):
+        self.rendered()
+        post = Post.objects.get(pk=self.posts[0].pk)
+        post.text = 'Исправленный пост'
+        post.save()
+        Comment.objects.create(
+            post=self.posts[1], author=self.author, text='Комментарий')
+        response, count = self.rendered()
+        self.assertEqual(count, 2)
+        self.assertContains(response, 'Исправленный пост')
+        self.assertContains(response, 'комментариев: 1')
+
+    def test_page_cards_are_read_in_bulk(self):
+        posts = list(Post.objects.feed())
+        cards.render_cards(posts)
+        get_many = cache.get_many
+        with mock.patch.object(cache, 'get_many', wraps=get_many) as read, \
+                mock.patch.object(cards, 'render_to_string') as render:
+            self.assertEqual(len(cards.render_cards(posts)), 3)
+        # Поколения всех постов и затем все карточки.
+        self.assertEqual(read.call_count, 2)
+        render.assert_not_called()
+
+    def test_edit_button_is_not_cached(self):
+        self.rendered()
+        edit = reverse('posts:edit', args=[self.posts[0].pk])
+        self.assertNotContains(self.rendered()[0], edit)
+        self.client.force_login(self.author)
+        response, count = self.rendered()
+        self.assertEqual(count, 0)
+        self.assertContains(response, edit)
+
+    def test_comment_count_is_fresh_on_cached_list_pages(self):
+        group = Group.objects.create(
+            title='Группа', slug='cards', description='Описание')
+        post = Post.objects.create(
+            author=self.author, group=group, text='Пост группы')
+        index = reverse('posts:index')
+        urls = [
+            reverse('posts:group_list', args=[group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+        ]
+        for url in [index, *urls]:
+            self.assertNotContains(self.client.get(url), 'комментариев: 1')
+        feed = get_generations(['feed'])
+        Comment.objects.create(
+            post=post, author=self.author, text='Комментарий')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), 'комментариев: 1')
+        # Главная общая для всех и на комментарии не сбрасывается...
+        self.assertEqual(get_generations(['feed']), feed)
+        # ...а заново отрисованная берёт карточку с новым поколением поста.
+        bump('feed')
+        self.assertContains(self.client.get(index), 'комментариев: 1')
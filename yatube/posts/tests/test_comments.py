@@ -0,0 +1,162 @@
+import json
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post, User
+from posts.views import comment_page
+
+
+@override_settings(COMMENTS_PER_PAGE=3)
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        cls.comments = [
+            Comment.objects.create(
+                post=cls.post,
+                author=User.objects.create_user(username=f'reader{number}'),
+                text=f'Комментарий {number}')
+            for number in range(7)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_post_detail_shows_first_page(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        page = response.context['comments']
+        self.assertEqual(list(page), self.comments[:-4:-1])
+        self.assertContains(response, 'Показать ещё комментарии')
+        self.assertContains(response, reverse(
+            'posts:comments', args=[self.post.pk]) + '?cursor=')
+
+    def test_comment_authors_are_loaded_with_comments(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        with self.assertNumQueries(0):
+            [comment.author.username for comment in response.context[
+                'comments']]
+
+    def test_fragments_walk_all_comments(self):
+        url = reverse('posts:comments', args=[self.post.pk])
+        seen = []
+        cursor = ''
+        while True:
+            response = self.client.get(
+                url, {'format': 'json', 'cursor': cursor})
+            data = json.loads(response.content)
+            seen += [comment['text'] for comment in data['comments']]
+            cursor = data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(
+            seen, [f'Комментарий {number}' for number in range(6, -1, -1)])
+
+    def test_html_fragment(self):
+        response = self.client.get(
+            reverse('posts:comments', args=[self.post.pk]))
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertContains(response, 'Комментарий 6')
+
+    def test_unknown_post_is_404(self):
+        response = self.client.get(reverse('posts:comments', args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(
+    COMMENTS_PER_PAGE=10, COMMENT_MAX_DEPTH=3,
+    COMMENT_PREVIEW_REPLIES=2, COMMENT_PREVIEW_DEPTH=2)
+class CommentThreadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.user, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def comment(self, text, parent=None):
+        return Comment.objects.create(
+            post=self.post, author=self.user, text=text, parent=parent)
+
+    def test_paths_follow_the_tree(self):
+        root = self.comment('Корень')
+        reply = self.comment('Ответ', root)
+        nested = self.comment('Ответ на ответ', reply)
+        self.assertEqual(root.path, f'{root.pk:010d}')
+        self.assertEqual(nested.path, f'{root.path}/{reply.pk:010d}/'
+                                      f'{nested.pk:010d}')
+        self.assertEqual((nested.root_id, nested.depth), (root.pk, 2))
+        stored = Comment.objects.get(pk=nested.pk)
+        self.assertEqual((stored.path, stored.root_id), (
+            nested.path, root.pk))
+
+    def test_reply_via_post_respects_max_depth(self):
+        parent = self.comment('Корень')
+        for _ in range(4):
+            self.client.post(
+                reverse('posts:add_comment', args=[self.post.pk]),
+                {'text': 'Ответ', 'parent': parent.pk})
+            parent = Comment.objects.latest('pk')
+        self.assertEqual(
+            list(Comment.objects.order_by('pk').values_list(
+                'depth', flat=True)),
+            [0, 1, 2, 3, 3])
+
+    def test_reply_to_comment_of_other_post_is_404(self):
+        other = Post.objects.create(author=self.user, text='Другой')
+        foreign = Comment.objects.create(
+            post=other, author=self.user, text='Чужой')
+        response = self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Ответ', 'parent': foreign.pk})
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_detail_previews_threads_in_two_queries(self):
+        root = self.comment('Корень')
+        first = self.comment('Первый ответ', root)
+        self.comment('Глубокий ответ', self.comment('Ответ', first))
+        self.comment('Поздний ответ', root)
+        other = self.comment('Другая ветка')
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk]))
+        page = response.context['comments']
+        self.assertEqual(list(page), [other, root])
+        self.assertEqual(
+            [reply.text for reply in page[1].replies],
+            ['Первый ответ', 'Ответ'])
+        self.assertEqual(page[1].hidden_replies, 2)
+        self.assertEqual(page[0].replies, [])
+        self.assertContains(response, reverse(
+            'posts:comment_thread', args=[self.post.pk, root.pk]))
+        with self.assertNumQueries(2):
+            comment_page(response.wsgi_request, self.post.pk)
+
+    def test_thread_page_is_paginated_by_path(self):
+        root = self.comment('Корень')
+        replies = [
+            self.comment(f'Ответ {number}', root) for number in range(3)]
+        self.comment('Вне ветки')
+        url = reverse('posts:comment_thread', args=[self.post.pk, root.pk])
+        with self.settings(COMMENTS_PER_PAGE=2):
+            response = self.client.get(url)
+            self.assertEqual(response.context['replies'], replies[:2])
+            response = self.client.get(
+                url, {'after': response.context['next_after']})
+        self.assertEqual(response.context['replies'], replies[2:])
+        self.assertIsNone(response.context['next_after'])
+
+    def test_deleting_comment_removes_its_branch(self):
+        root = self.comment('Корень')
+        self.comment('Ответ на ответ', self.comment('Ответ', root))
+        root.delete()
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 0)
@@ -0,0 +1,67 @@
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='counted_author')
+        cls.reader = User.objects.create_user(username='counted_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='counted', description='Описание')
+        cls.other_group = Group.objects.create(
+            title='Другая группа', slug='other', description='Описание')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group)
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        post.delete()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_comment_counter(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий')
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comment_count, 0)
+
+    def test_follow_counters(self):
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        follow.delete()
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+
+    def test_rebuild_counters_fixes_bulk_created_rows(self):
+        Post.objects.bulk_create(
+            [Post(text='Пост', author=self.author, group=self.group)] * 3)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_counters', verify=True, stdout=StringIO())
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 3)
+        call_command('rebuild_counters', verify=True, stdout=StringIO())
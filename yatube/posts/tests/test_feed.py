@@ -0,0 +1,68 @@
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import FeedEntry, Follow, Post, User
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='feed_author')
+        cls.reader = User.objects.create_user(username='feed_reader')
+        cls.old_post = Post.objects.create(
+            text='Пост до подписки', author=cls.author)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def feed_posts(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_new_posts_fan_out(self):
+        self.authorized_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': 'feed_author'}))
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(self.feed_posts(), [new_post, self.old_post])
+
+    def test_unfollow_trims_feed(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.authorized_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': 'feed_author'}))
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed_posts(), [])
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_popular_author_is_read_on_request(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed_posts(), [new_post, self.old_post])
+
+    @override_settings(FEED_FANOUT_LIMIT=1)
+    def test_posts_from_celebrity_period_survive_demotion(self):
+        fan = User.objects.create_user(username='feed_fan')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=fan, author=self.author)
+        celebrity_post = Post.objects.create(
+            text='Пост знаменитости', author=self.author)
+        self.assertFalse(FeedEntry.objects.filter(
+            user=self.reader, post=celebrity_post).exists())
+        Follow.objects.get(user=fan).delete()
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=celebrity_post).exists())
+        self.assertEqual(self.feed_posts(), [celebrity_post, self.old_post])
+
+    def test_backfill_takes_all_posts_of_author(self):
+        posts = [
+            Post.objects.create(text=f'Пост {number}', author=self.author)
+            for number in range(3)
+        ]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=self.reader).count(),
+            len(posts) + 1)
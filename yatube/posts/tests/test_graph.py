@@ -0,0 +1,112 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import graph
+from posts.models import Follow, FollowSuggestion, User
+
+
+class FollowGraphTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('ann', 'bob', 'cat', 'dan', 'eve')
+        }
+        for user, author in (
+            ('ann', 'bob'), ('ann', 'cat'),
+            ('bob', 'ann'), ('bob', 'dan'), ('bob', 'eve'),
+            ('cat', 'dan'), ('cat', 'ann'),
+        ):
+            Follow.objects.create(
+                user=cls.users[user], author=cls.users[author])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def names(self, users):
+        return sorted(user.username for user in users)
+
+    def test_lists(self):
+        ann = self.users['ann']
+        self.assertEqual(
+            self.names(follow.user for follow in graph.followers(ann)),
+            ['bob', 'cat'])
+        self.assertEqual(
+            self.names(follow.author for follow in graph.following(ann)),
+            ['bob', 'cat'])
+        self.assertEqual(
+            self.names(follow.author for follow in graph.mutuals(
+                self.users['bob'])),
+            ['ann'])
+
+    def test_suggestions_rank_friends_of_friends(self):
+        out = StringIO()
+        call_command('recompute_suggestions', stdout=out)
+        self.assertIn('рекомендаций: 4', out.getvalue())
+        ann = self.users['ann']
+        self.assertEqual(
+            [(item.suggested.username, item.score)
+             for item in graph.suggestions(ann)],
+            [('dan', 2), ('eve', 1)])
+        Follow.objects.create(user=ann, author=self.users['dan'])
+        self.assertEqual(
+            [item.suggested.username for item in graph.suggestions(ann)],
+            ['eve'])
+
+    @override_settings(FOLLOW_SUGGESTIONS=1)
+    def test_recompute_replaces_old_suggestions(self):
+        list(graph.recompute_suggestions(batch_size=2))
+        self.assertEqual(
+            FollowSuggestion.objects.filter(user=self.users['ann']).count(),
+            1)
+        Follow.objects.filter(user=self.users['cat']).delete()
+        list(graph.recompute_suggestions(batch_size=2))
+        self.assertFalse(
+            FollowSuggestion.objects.filter(user=self.users['cat']).exists())
+        self.assertEqual(
+            FollowSuggestion.objects.get(user=self.users['ann']).score, 1)
+
+    @override_settings(FOLLOWS_PER_PAGE=1)
+    def test_follower_pages(self):
+        url = reverse('posts:followers', args=['ann'])
+        seen = []
+        response = self.client.get(url)
+        while True:
+            seen += response.context['users']
+            cursor = response.context['page_obj'].next_cursor
+            if cursor is None:
+                break
+            response = self.client.get(url, {'cursor': cursor})
+        self.assertEqual(self.names(seen), ['bob', 'cat'])
+
+    def test_list_views(self):
+        for name in ('followers', 'following', 'mutuals'):
+            with self.subTest(name=name):
+                response = self.client.get(
+                    reverse(f'posts:{name}', args=['bob']))
+                self.assertTemplateUsed(response, 'posts/follow_list.html')
+        response = self.client.get(reverse('posts:followers', args=['nobody']))
+        self.assertEqual(response.status_code, 404)
+
+    def test_suggestions_page(self):
+        url = reverse('posts:follow_suggestions')
+        self.assertRedirects(
+            self.client.get(url), f'{reverse("users:login")}?next={url}')
+        list(graph.recompute_suggestions())
+        self.client.force_login(self.users['ann'])
+        self.assertContains(self.client.get(url), 'общих подписок: 2')
+
+    def test_profile_shows_follow_counts(self):
+        response = self.client.get(reverse('posts:profile', args=['ann']))
+        self.assertContains(response, 'Подписчиков: 2')
+        Follow.objects.create(
+            user=self.users['dan'], author=self.users['ann'])
+        response = self.client.get(reverse('posts:profile', args=['ann']))
+        self.assertContains(response, 'Подписчиков: 3')
+        response = self.client.get(reverse('posts:profile', args=['dan']))
+        self.assertContains(response, 'Подписок: 1')
@@ -0,0 +1,46 @@
+import datetime
+
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+from django.utils import timezone
+
+
+class RemoveInvalidFollowsMigrationTests(TransactionTestCase):
+    before = [('posts', '0019_post_search')]
+    after = [('posts', '0020_indexes_and_follow_constraints')]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        self.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicates_with_different_dates_are_removed(self):
+        apps = self.migrate(self.before)
+        User = apps.get_model('auth', 'User')
+        Follow = apps.get_model('posts', 'Follow')
+        UserStats = apps.get_model('posts', 'UserStats')
+        user = User.objects.create(username='follower')
+        author = User.objects.create(username='followed')
+        UserStats.objects.create(user=user, following_count=3)
+        UserStats.objects.create(user=author, followers_count=2)
+        first = Follow.objects.create(user=user, author=author)
+        second = Follow.objects.create(user=user, author=author)
+        Follow.objects.filter(pk=second.pk).update(
+            pub_date=timezone.now() - datetime.timedelta(days=1))
+        Follow.objects.create(user=user, author=user)
+
+        apps = self.migrate(self.after)
+        Follow = apps.get_model('posts', 'Follow')
+        self.assertEqual(
+            list(Follow.objects.values_list('pk', flat=True)), [first.pk])
+        UserStats = apps.get_model('posts', 'UserStats')
+        self.assertEqual(
+            UserStats.objects.get(user_id=author.pk).followers_count, 1)
+        self.assertEqual(
+            UserStats.objects.get(user_id=user.pk).following_count, 1)
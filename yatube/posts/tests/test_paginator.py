@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post, User
+from posts.utils import CursorPaginator
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='cursor_author')
+        for i in range(settings.NUMBER_POST * 2 + 5):
+            Post.objects.create(text=f'Пост {i}', author=cls.author)
+
+    def setUp(self):
+        self.guest_client = Client()
+
+    def test_pages_do_not_overlap(self):
+        """Страницы курсора покрывают все посты без повторов."""
+        paginator = CursorPaginator(Post.objects.all(), settings.NUMBER_POST)
+        page = paginator.cursor_page()
+        seen = [post.pk for post in page]
+        while page.has_next():
+            page = CursorPaginator(
+                Post.objects.all(), settings.NUMBER_POST
+            ).cursor_page(page.next_cursor)
+            seen.extend(post.pk for post in page)
+        expected = list(Post.objects.order_by(
+            '-pub_date', '-pk').values_list('pk', flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page), 5)
+
+    def test_previous_cursor_returns_same_page(self):
+        first = CursorPaginator(
+            Post.objects.all(), settings.NUMBER_POST).cursor_page()
+        second = CursorPaginator(
+            Post.objects.all(), settings.NUMBER_POST
+        ).cursor_page(first.next_cursor)
+        back = CursorPaginator(
+            Post.objects.all(), settings.NUMBER_POST
+        ).cursor_page(second.previous_cursor)
+        self.assertEqual(list(back), list(first))
+        self.assertEqual(back.number, 1)
+        self.assertTrue(back.has_next())
+        self.assertFalse(back.has_previous())
+
+    def test_page_does_not_count_rows(self):
+        """Страница курсора выбирается одним запросом без COUNT(*)."""
+        paginator = CursorPaginator(Post.objects.all(), settings.NUMBER_POST)
+        with self.assertNumQueries(1):
+            page = paginator.cursor_page()
+            len(page)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        response = self.guest_client.get(
+            reverse('posts:profile', kwargs={'username': 'cursor_author'}),
+            {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.context['page_obj'].number, 1)
+        self.assertEqual(
+            len(response.context['page_obj']), settings.NUMBER_POST)
+
+    def test_view_follows_next_cursor(self):
+        url = reverse('posts:profile', kwargs={'username': 'cursor_author'})
+        response = self.guest_client.get(url)
+        next_cursor = response.context['page_obj'].next_cursor
+        response = self.guest_client.get(url, {'cursor': next_cursor})
+        self.assertEqual(response.context['page_obj'].number, 2)
+        self.assertContains(response, '?cursor=')
@@ -0,0 +1,152 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import graph, threads
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+
+
+class FeedQueriesTests(TestCase):
+    """Число запросов страницы не зависит от количества постов на ней."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.group = Group.objects.create(
+            title='Группа', slug='queries', description='Описание')
+        cls.reader = User.objects.create_user(username='reader')
+        for i in range(settings.NUMBER_POST):
+            author = User.objects.create_user(
+                username=f'author_{i}', first_name='Имя', last_name='Фамилия')
+            post = Post.objects.create(
+                text=f'Пост {i}', author=author, group=cls.group)
+            Comment.objects.create(post=post, author=cls.reader, text='Ок')
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.author = User.objects.get(username='author_0')
+        for i in range(3):
+            Post.objects.create(
+                text=f'Ещё пост {i}', author=cls.author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_index_queries(self):
+        with self.assertNumQueries(1):
+            self.guest_client.get(reverse('posts:index'))
+
+    def test_group_posts_queries(self):
+        with self.assertNumQueries(2):
+            self.guest_client.get(
+                reverse('posts:group_list', kwargs={'slug': 'queries'}))
+
+    def test_profile_queries(self):
+        with self.assertNumQueries(3):
+            self.guest_client.get(
+                reverse('posts:profile', kwargs={'username': 'author_0'}))
+
+    def test_follow_index_queries(self):
+        with self.assertNumQueries(4):
+            response = self.authorized_client.get(
+                reverse('posts:follow_index'))
+        self.assertEqual(
+            sum(post.comment_count for post in response.context['page_obj']),
+            settings.NUMBER_POST - 3)
+
+
+class QueryPlanTests(TestCase):
+    """Горячие выборки идут по составным индексам, без сортировки."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='plan_author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='plan', description='Описание')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group)
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        self.assertIn(f'USING INDEX {index}', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_author_and_group_feeds(self):
+        order = ('-pub_date', '-pk')
+        self.assertUsesIndex(
+            self.author.posts.feed().order_by(*order)[:11],
+            'post_author_pub_date_idx')
+        self.assertUsesIndex(
+            self.group.posts.feed().order_by(*order)[:11],
+            'post_group_pub_date_idx')
+
+    def test_post_comments(self):
+        self.assertUsesIndex(
+            Comment.objects.filter(post=self.post),
+            'comment_post_pub_date_idx')
+        comments = Comment.objects.filter(post=self.post).order_by(
+            '-pub_date', '-pk')
+        self.assertUsesIndex(comments[:21], 'comment_post_pub_date_idx')
+        self.assertUsesIndex(
+            comments.filter(pub_date__lt=self.post.pub_date)[:21],
+            'comment_post_pub_date_idx')
+
+    def test_comment_threads(self):
+        comment = Comment.objects.create(
+            post=self.post, author=self.author, text='Корень')
+        self.assertUsesIndex(
+            Comment.objects.filter(post=self.post, depth=0).order_by(
+                '-pub_date', '-pk')[:21],
+            'comment_top_level_idx')
+        self.assertUsesIndex(
+            threads.subtree(comment).order_by('path')[:21],
+            'comment_thread_idx')
+
+    def test_follow_lists(self):
+        self.assertUsesIndex(
+            graph.followers(self.author).order_by('-pub_date', '-pk')[:31],
+            'follow_author_pub_date_idx')
+        self.assertUsesIndex(
+            graph.following(self.author).order_by('-pub_date', '-pk')[:31],
+            'follow_user_pub_date_idx')
+
+    def test_follow_lookup_uses_unique_constraint(self):
+        plan = Follow.objects.filter(
+            user=self.author, author=self.author).explain()
+        self.assertIn('(user_id=? AND author_id=?)', plan)
+
+
+class FollowConstraintTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='follower')
+        cls.author = User.objects.create_user(username='followed')
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_database_rejects_duplicates_and_self_follow(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        for author in (self.author, self.user):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                Follow.objects.create(user=self.user, author=author)
+
+    def test_repeated_follow_is_idempotent(self):
+        url = reverse('posts:profile_follow', args=[self.author.username])
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            UserStats.objects.get(user=self.author).followers_count, 1)
+
+    def test_unfollow_without_follow(self):
+        response = self.client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertRedirects(
+            response, reverse('posts:profile', args=[self.author.username]))
@@ -0,0 +1,74 @@
+from django.contrib.admin.sites import site
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Group, Post, User
+
+
+class PostSearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='writer')
+        cls.other = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Кошки', slug='cats', description='Про кошек')
+        cls.rare = Post.objects.create(
+            author=cls.author, group=cls.group,
+            text='Кошка спит на подоконнике.')
+        cls.frequent = Post.objects.create(
+            author=cls.other,
+            text='Кошка, кошка, кошка <b>и</b> ещё раз кошка.')
+        Post.objects.create(author=cls.author, text='Собака лает.')
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get_page(self, **params):
+        response = self.client.get(reverse('posts:search'), params)
+        return response.context['page_obj']
+
+    def test_index_is_available_on_sqlite(self):
+        self.assertTrue(search.is_available())
+
+    def test_results_are_ranked_and_highlighted(self):
+        page = self.get_page(q='кошка')
+        self.assertEqual(list(page), [self.frequent, self.rare])
+        self.assertEqual(page.paginator.count, 2)
+        snippet = page[0].snippet
+        self.assertIn('<mark>Кошка</mark>', snippet)
+        self.assertIn('&lt;b&gt;', snippet)
+
+    def test_filters_by_group_and_author(self):
+        self.assertEqual(
+            list(self.get_page(q='кошка', group='cats')), [self.rare])
+        self.assertEqual(
+            list(self.get_page(q='кошка', author='reader')), [self.frequent])
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.get(pk=self.rare.pk)
+        post.text = 'Теперь тут про попугая'
+        post.save()
+        self.assertEqual(list(self.get_page(q='попуга')), [post])
+        Post.objects.get(pk=self.frequent.pk).delete()
+        self.assertEqual(list(self.get_page(q='кошка')), [])
+
+    def test_fts_syntax_in_query_is_ignored(self):
+        self.assertEqual(len(self.get_page(q='кошка" (* ^')), 2)
+        self.assertEqual(len(self.get_page(q='***')), 0)
+
+    def test_admin_search_uses_index(self):
+        request = RequestFactory().get('/')
+        queryset, use_distinct = site._registry[Post].get_search_results(
+            request, Post.objects.all(), 'собак')
+        self.assertEqual(queryset.get().text, 'Собака лает.')
+        self.assertFalse(use_distinct)
+        queryset, _ = site._registry[Post].get_search_results(
+            request, Post.objects.all(), 'кошка')
+        self.assertCountEqual(queryset, [self.rare, self.frequent])
+        queryset, _ = site._registry[Post].get_search_results(
+            request, Post.objects.all(), '!!!')
+        self.assertEqual(list(queryset), [])
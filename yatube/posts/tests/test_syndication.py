@@ -0,0 +1,112 @@
+import json
+from xml.etree import ElementTree
+
+from django.core.cache import cache
+from django.http import StreamingHttpResponse
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import syndication
+from posts.models import Follow, Group, Post, User
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+DC = '{http://purl.org/dc/elements/1.1/}'
+
+
+class SyndicationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='writer', first_name='Лев', last_name='Толстой')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Кошки', slug='cats', description='Про кошек')
+        cls.first = Post.objects.create(
+            author=cls.author, group=cls.group, text='Первый <пост> & ко')
+        cls.second = Post.objects.create(
+            author=cls.reader, text='Второй пост')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def get(self, name, fmt, *args, **headers):
+        return self.client.get(
+            reverse(f'posts:{name}', args=[*args, fmt]), **headers)
+
+    def content(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def test_index_atom_is_streamed(self):
+        response = self.get('index_feed', 'atom')
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertTrue(response['Content-Type'].startswith(
+            'application/atom+xml'))
+        root = ElementTree.fromstring(self.content(response))
+        titles = [
+            entry.find(f'{ATOM}title').text
+            for entry in root.iter(f'{ATOM}entry')
+        ]
+        self.assertCountEqual(titles, ['Первый <пост> & ко', 'Второй пост'])
+
+    def test_group_rss(self):
+        response = self.get('group_feed', 'rss', self.group.slug)
+        root = ElementTree.fromstring(self.content(response))
+        items = root.findall('channel/item')
+        self.assertEqual(len(items), 1)
+        self.assertEqual(items[0].find(f'{DC}creator').text, 'Лев Толстой')
+
+    def test_profile_json(self):
+        response = self.get('profile_feed', 'json', self.reader.username)
+        data = json.loads(self.content(response))
+        self.assertEqual(
+            [item['id'] for item in data['items']], [str(self.second.pk)])
+
+    def test_unknown_group_is_404(self):
+        response = self.get('group_feed', 'rss', 'dogs')
+        self.assertEqual(response.status_code, 404)
+
+    def test_subscription_feed_needs_valid_token(self):
+        token = syndication.follow_token(self.reader)
+        response = self.get('subscription_feed', 'json', token)
+        data = json.loads(self.content(response))
+        self.assertEqual(
+            [item['id'] for item in data['items']], [str(self.first.pk)])
+        response = self.get('subscription_feed', 'json', token + 'x')
+        self.assertEqual(response.status_code, 404)
+
+    def test_unchanged_feed_is_not_modified(self):
+        response = self.get('index_feed', 'rss')
+        etag = response['ETag']
+        self.assertFalse(etag.startswith('W/'))
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            response = self.get(
+                'index_feed', 'rss', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.get(
+            'index_feed', 'rss',
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_new_post_changes_etag(self):
+        etag = self.get('index_feed', 'atom')['ETag']
+        Post.objects.create(author=self.author, text='Третий пост')
+        response = self.get('index_feed', 'atom', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_follow_changes_subscription_etag(self):
+        token = syndication.follow_token(self.reader)
+        etag = self.get('subscription_feed', 'atom', token)['ETag']
+        Follow.objects.filter(user=self.reader).delete()
+        response = self.get('subscription_feed', 'atom', token)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_follow_page_links_subscription_feed(self):
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertContains(response, reverse(
+            'posts:subscription_feed',
+            args=[syndication.follow_token(self.reader), 'atom']))
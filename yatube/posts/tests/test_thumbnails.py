@@ -0,0 +1,151 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import get_thumbnail
+
+from posts import thumbnails
+from posts.cache import get_generations
+from posts.models import Post, ThumbnailJob, User
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image(name='picture.png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 20), 'red').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    THUMBNAIL_RENDITIONS=[('20x10', {'crop': 'center'})],
+    THUMBNAIL_WIDTHS=(10, 20),
+)
+class ThumbnailPipelineTests(TransactionTestCase):
+    # Вне транзакции чтения могут уйти на реплики, если они настроены.
+    databases = '__all__'
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='painter')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_post_create_enqueues_image(self):
+        self.client.post(
+            reverse('posts:create'),
+            {'text': 'Пост с картинкой', 'image': make_image()},
+        )
+        post = Post.objects.get()
+        self.assertTrue(
+            ThumbnailJob.objects.filter(image=post.image.name).exists())
+
+    def test_edit_without_new_image_does_not_enqueue(self):
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_image())
+        self.client.post(
+            reverse('posts:edit', kwargs={'post_id': post.pk}),
+            {'text': 'Новый текст'},
+        )
+        self.assertFalse(ThumbnailJob.objects.exists())
+
+    def test_worker_generates_renditions(self):
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_image())
+        scope = [f'post:{post.pk}']
+        generation = get_generations(scope)
+        call_command('thumbnail_worker', '--backfill', '--workers=1',
+                     stdout=io.StringIO())
+        self.assertFalse(ThumbnailJob.objects.exists())
+        # Страницы, выведенные с исходником, сброшены.
+        self.assertNotEqual(get_generations(scope), generation)
+        with mock.patch(
+            'sorl.thumbnail.engines.pil_engine.Engine.write'
+        ) as write:
+            thumbnail = get_thumbnail(post.image, '20x10', crop='center')
+            html = Template(
+                '{% load post_images %}'
+                '{% post_picture image "20x10" crop="center" %}'
+            ).render(Context({'image': post.image}))
+        # Воркер уже нарезал все миниатюры, шаблону остаётся взять их
+        # из KV store.
+        write.assert_not_called()
+        self.assertTrue(thumbnail.exists())
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn('.webp 10w', html)
+        self.assertIn('.jpg 20w', html)
+
+    def test_picture_without_renditions_does_not_render_them(self):
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_image())
+        with mock.patch(
+            'sorl.thumbnail.engines.pil_engine.Engine.write'
+        ) as write:
+            html = Template(
+                '{% load post_images %}'
+                '{% post_picture image "20x10" crop="center" %}'
+            ).render(Context({'image': post.image}))
+        write.assert_not_called()
+        self.assertIn(f'src="{post.image.url}"', html)
+        self.assertNotIn('srcset', html)
+        self.assertTrue(
+            ThumbnailJob.objects.filter(image=post.image.name).exists())
+
+    def test_lookup_finds_thumbnail_of_get_thumbnail(self):
+        post = Post.objects.create(
+            author=self.user, text='Пост', image=make_image())
+        self.assertIsNone(
+            thumbnails.cached_thumbnail(post.image, '20x10', crop='center'))
+        thumbnail = get_thumbnail(post.image, '20x10', crop='center')
+        found = thumbnails.cached_thumbnail(
+            post.image, '20x10', crop='center')
+        self.assertEqual(found.name, thumbnail.name)
+
+    def test_failed_job_is_retried_until_limit(self):
+        thumbnails.enqueue('posts/broken.png')
+        with mock.patch.object(
+            thumbnails, 'generate_renditions', side_effect=OSError
+        ) as generate, self.assertLogs('posts.thumbnails', 'ERROR'):
+            for attempt in range(4):
+                thumbnails.process_jobs(thumbnails.claim_jobs(10))
+        self.assertEqual(generate.call_count, 3)
+        job = ThumbnailJob.objects.get()
+        self.assertTrue(job.failed)
+        # Страница с этой картинкой снова ставит её в очередь: без толку.
+        thumbnails.enqueue('posts/broken.png')
+        self.assertEqual(ThumbnailJob.objects.get(), job)
+        self.assertEqual(thumbnails.claim_jobs(10), [])
+
+    def test_jobs_of_crashed_worker_are_reclaimed_after_lease(self):
+        thumbnails.enqueue('posts/picture.png')
+        # Воркер забрал задачу и упал, не вызвав process_jobs.
+        self.assertEqual(len(thumbnails.claim_jobs(10)), 1)
+        self.assertTrue(ThumbnailJob.objects.exists())
+        self.assertEqual(thumbnails.claim_jobs(10), [])
+        with self.settings(THUMBNAIL_LEASE_SECONDS=0):
+            jobs = thumbnails.claim_jobs(10)
+            self.assertEqual([job.attempts for job in jobs], [2])
+            thumbnails.claim_jobs(10)
+            # Третья аренда тоже истекла: попытки кончились.
+            with self.assertLogs('posts.thumbnails', 'ERROR'):
+                self.assertEqual(thumbnails.claim_jobs(10), [])
+        self.assertTrue(ThumbnailJob.objects.get().failed)
+
+    def test_job_is_deleted_after_success(self):
+        thumbnails.enqueue('posts/picture.png')
+        jobs = thumbnails.claim_jobs(10)
+        with mock.patch.object(thumbnails, 'generate_renditions'):
+            self.assertEqual(thumbnails.process_jobs(jobs), 0)
+        self.assertFalse(ThumbnailJob.objects.exists())
@@ -0,0 +1,77 @@
+import io
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from posts import search
+from posts.models import (
+    Comment, FeedEntry, Follow, Group, Post, User, UserStats
+)
+
+
+class ImportExportTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.author = User.objects.create_user(
+            username='author', password='secret')
+        self.reader = User.objects.create_user(username='reader')
+        self.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        self.post = Post.objects.create(
+            author=self.author, group=self.group, text='Старый пост')
+        self.old_date = timezone.now() - timedelta(days=400)
+        Post.objects.filter(pk=self.post.pk).update(pub_date=self.old_date)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий')
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, dataset, file_format):
+        return os.path.join(self.directory.name, f'{dataset}.{file_format}')
+
+    def round_trip(self, file_format):
+        datasets = ('users', 'groups', 'posts', 'comments', 'follows')
+        for dataset in datasets:
+            call_command('export_data', dataset,
+                         output=self.path(dataset, file_format),
+                         stderr=io.StringIO())
+        for model in (User, Group):
+            model.objects.all().delete()
+        self.assertFalse(Post.objects.exists())
+        for dataset in datasets:
+            call_command('import_data', dataset,
+                         self.path(dataset, file_format),
+                         batch_size=1, stdout=io.StringIO())
+
+    def assert_restored(self):
+        post = Post.objects.get()
+        self.assertEqual(post.pk, self.post.pk)
+        self.assertEqual(post.pub_date, self.old_date)
+        self.assertEqual(post.comment_count, 1)
+        self.assertEqual(Group.objects.get().posts_count, 1)
+        author = User.objects.get(username='author')
+        self.assertTrue(author.check_password('secret'))
+        self.assertEqual(UserStats.for_user(author).followers_count, 1)
+        self.assertTrue(
+            FeedEntry.objects.filter(user__username='reader').exists())
+        self.assertEqual(search.search('старый').count(), 1)
+
+    def test_jsonl_round_trip(self):
+        self.round_trip('jsonl')
+        self.assert_restored()
+
+    def test_csv_round_trip(self):
+        self.round_trip('csv')
+        self.assert_restored()
+
+    def test_export_to_stdout(self):
+        out = io.StringIO()
+        call_command('export_data', 'groups', stdout=out,
+                     stderr=io.StringIO())
+        self.assertIn('"slug": "group"', out.getvalue())
@@ -0,0 +1,83 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts.models import Follow, Post, User
+from posts.viewer import Viewer
+
+
+class ViewerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(username=f'author{number}')
+            for number in range(3)
+        ]
+        for author in cls.authors[:2]:
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.post = Post.objects.create(author=cls.reader, text='Свой пост')
+
+    def setUp(self):
+        cache.clear()
+        self.request = RequestFactory().get('/')
+        self.request.user = self.reader
+
+    def test_followed_ids_are_loaded_once(self):
+        viewer = Viewer(self.request)
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                [viewer.follows(author) for author in self.authors],
+                [True, True, False])
+            self.assertTrue(viewer.follows(self.authors[0].pk))
+
+    def test_ownership_needs_no_queries(self):
+        viewer = Viewer(self.request)
+        post = Post.objects.get(pk=self.post.pk)
+        with self.assertNumQueries(0):
+            self.assertTrue(viewer.owns(post))
+            self.assertTrue(viewer.is_self(self.reader))
+            self.assertFalse(viewer.is_self(self.authors[0]))
+
+    def test_anonymous(self):
+        self.request.user = AnonymousUser()
+        viewer = Viewer(self.request)
+        with self.assertNumQueries(0):
+            self.assertFalse(viewer.is_authenticated)
+            self.assertFalse(viewer.follows(self.authors[0]))
+            self.assertFalse(viewer.owns(self.post))
+            self.assertFalse(viewer.is_self(AnonymousUser()))
+
+    def test_follow_list_marks_followed_authors(self):
+        Follow.objects.create(user=self.authors[2], author=self.authors[0])
+        Follow.objects.create(user=self.authors[2], author=self.authors[1])
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:following', args=[self.authors[2].username])
+        response = client.get(url)
+        self.assertContains(response, 'вы подписаны', count=2)
+
+    def test_profile_checks_only_its_author(self):
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:profile', args=[self.authors[0].username])
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        self.assertTrue(response.context['following'])
+        follows = [
+            query['sql'] for query in captured
+            if 'posts_follow' in query['sql']
+        ]
+        self.assertEqual(len(follows), 1)
+        self.assertIn('LIMIT 1', follows[0])
+
+    def test_edit_button_only_for_author(self):
+        client = Client()
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        edit = reverse('posts:edit', args=[self.post.pk])
+        self.assertNotContains(client.get(url), edit)
+        client.force_login(self.reader)
+        self.assertContains(client.get(url), edit)
@@ -55,6 +55,7 @@ class PostTests(TestCase):
         }
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.user = User.objects.create_user(username='test_user')
         self.authorized_client = Client()
@@ -130,7 +131,14 @@ class PostTests(TestCase):
             new_comment = None
         self.assertIsNotNone(new_comment)
 
-    def test_index_post_is_in_cache_after_deleting(self):
+    def test_index_is_served_from_cache(self):
+        url = reverse(PostTests.index_template[0])
+        response_1 = self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            response_2 = self.guest_client.get(url)
+        self.assertEqual(response_1.content, response_2.content)
+
+    def test_index_cache_is_invalidated_after_deleting(self):
         response_1 = self.authorized_client.get(
             reverse(PostTests.index_template[0])
         )
@@ -141,7 +149,7 @@ class PostTests(TestCase):
             reverse(PostTests.index_template[0])
         )
         content_after_post_deletion = response_2.content
-        self.assertEqual(
+        self.assertNotEqual(
             content_before_post_deletion,
             content_after_post_deletion)
 
@@ -207,7 +215,7 @@ class PostTests(TestCase):
         response_2 = self.authorized_client.get(
             reverse(PostTests.index_template[0])
         ).content
-        self.assertEqual(response, response_2)
+        self.assertNotEqual(response, response_2)
 
 
 class PaginatorViewsTest(TestCase):
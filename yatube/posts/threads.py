@@ -0,0 +1,113 @@
+"""Ветки ответов на комментарии.
+
+Комментарий хранит root (корень ветки), depth и path — id предков и
+свой id через '/', дополненные нулями до COMMENT_PATH_WIDTH цифр (см.
+Comment.save). Поэтому сортировка по path даёт ветку в порядке обхода
+в глубину, а любое поддерево — это диапазон path внутри одного root,
+который читается по индексу (root, path) одним запросом.
+"""
+from django.conf import settings
+from django.db.models import (
+    CharField, Count, F, IntegerField, OuterRef, Subquery, Value
+)
+from django.db.models.functions import Cast, Coalesce, LPad
+
+from .models import COMMENT_PATH_WIDTH, Comment
+from .utils import RawSubquery
+
+
+def fill_root_paths(comments=None):
+    """Проставляет path и root комментариям, вставленным bulk_create.
+
+    Такие комментарии считаются корнями веток.
+    """
+    if comments is None:
+        comments = Comment.objects.all()
+    comments.filter(path='', parent__isnull=True).update(
+        root=F('pk'),
+        depth=0,
+        path=LPad(Cast('pk', CharField()), COMMENT_PATH_WIDTH, Value('0')),
+    )
+
+
+def reply_parent(parent):
+    """Комментарий, к которому на самом деле прикрепить ответ.
+
+    Глубже COMMENT_MAX_DEPTH ветка не растёт: ответ на самый глубокий
+    комментарий становится ответом его родителю.
+    """
+    if parent.depth >= settings.COMMENT_MAX_DEPTH:
+        return parent.parent
+    return parent
+
+
+def subtree(comment):
+    """Все ответы в ветке под комментарием, без него самого."""
+    # Пути потомков начинаются с path + '/'; '0' идёт сразу после '/'.
+    return Comment.objects.filter(
+        root_id=comment.root_id,
+        path__gt=f'{comment.path}/',
+        path__lt=f'{comment.path}0',
+    )
+
+
+def with_reply_counts(comments):
+    """Добавляет корням веток число ответов, reply_total."""
+    replies = Comment.objects.filter(
+        root=OuterRef('pk'), depth__gt=0,
+    ).order_by().values('root').annotate(total=Count('pk'))
+    return comments.annotate(
+        reply_total=Coalesce(
+            Subquery(replies.values('total'), output_field=IntegerField()),
+            0))
+
+
+def attach_replies(roots, limit=None, depth=None):
+    """Раскладывает по корням первые ``limit`` ответов их веток.
+
+    Ответы всех корней читаются одним запросом: ROW_NUMBER() по ветке
+    отбирает первые строки каждой ветки по path. Ответы глубже ``depth``
+    свёрнуты, их видно на странице ветки. У корня появляются replies и,
+    если он получен через with_reply_counts, hidden_replies.
+    """
+    limit = settings.COMMENT_PREVIEW_REPLIES if limit is None else limit
+    depth = settings.COMMENT_PREVIEW_DEPTH if depth is None else depth
+    roots = list(roots)
+    by_root = {root.pk: root for root in roots}
+    for root in roots:
+        root.replies = []
+    if not roots or not limit:
+        return roots
+    table = Comment._meta.db_table
+    placeholders = ', '.join(['%s'] * len(by_root))
+    first_replies = RawSubquery(
+        f'SELECT id FROM ('
+        f'SELECT id, ROW_NUMBER() OVER ('
+        f'PARTITION BY root_id ORDER BY path) AS position '
+        f'FROM {table} '
+        f'WHERE root_id IN ({placeholders}) AND depth BETWEEN 1 AND %s'
+        f') AS ranked WHERE position <= %s',
+        [*by_root, depth, limit],
+    )
+    replies = Comment.objects.filter(pk__in=first_replies).select_related(
+        'author').order_by('root_id', 'path')
+    for reply in replies:
+        by_root[reply.root_id].replies.append(reply)
+    for root in roots:
+        if hasattr(root, 'reply_total'):
+            root.hidden_replies = root.reply_total - len(root.replies)
+    return roots
+
+
+def thread_page(comment, after=None, per_page=None):
+    """Страница ветки под комментарием по ключу path, и ключ следующей."""
+    per_page = per_page or settings.COMMENTS_PER_PAGE
+    replies = subtree(comment).select_related('author').order_by('path')
+    if after:
+        replies = replies.filter(path__gt=after)
+    rows = list(replies[:per_page + 1])
+    next_after = rows[per_page - 1].path if len(rows) > per_page else None
+    rows = rows[:per_page]
+    for reply in rows:
+        reply.level = reply.depth - comment.depth
+    return rows, next_after
@@ -0,0 +1,200 @@
+"""Заблаговременная нарезка миниатюр картинок постов.
+
+post_create и post_edit только ставят картинку в очередь ThumbnailJob.
+manage.py thumbnail_worker забирает задачи пачками и нарезает все
+миниатюры из settings.THUMBNAIL_RENDITIONS в пуле потоков; sorl
+записывает их в свой KV store, и тег {% post_picture %} в шаблонах находит
+готовые файлы, не декодируя исходник внутри запроса. Пока миниатюр нет,
+тег выводит исходник и ставит картинку в очередь, а воркер после нарезки
+сбрасывает кэш страниц её постов. Картинка, которую не удалось нарезать
+за THUMBNAIL_MAX_ATTEMPTS попыток, остаётся в очереди с пометкой failed
+и больше не ставится и не берётся; чтобы повторить, удалите задачу.
+
+Каждая запись THUMBNAIL_RENDITIONS нарезается в нескольких ширинах из
+THUMBNAIL_WIDTHS: в формате по умолчанию и в THUMBNAIL_EXTRA_FORMATS.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.metrics import THUMBNAIL_DURATION, THUMBNAIL_FAILURES
+
+from . import cache
+from .models import Post, ThumbnailJob
+from .signals import post_scopes
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(*images):
+    """Ставит картинки в очередь.
+
+    Повторная постановка, в том числе неудавшейся картинки (failed),
+    ничего не делает.
+    """
+    names = [getattr(image, 'name', image) for image in images]
+    ThumbnailJob.objects.bulk_create(
+        [ThumbnailJob(image=name) for name in names if name],
+        ignore_conflicts=True,
+    )
+
+
+def enqueue_all():
+    """Ставит в очередь картинки всех постов, для заполнения media/posts/."""
+    images = Post.objects.exclude(image='').values_list('image', flat=True)
+    batch = []
+    for name in images.iterator():
+        batch.append(name)
+        if len(batch) == 500:
+            enqueue(*batch)
+            batch = []
+    enqueue(*batch)
+
+
+def variants(geometry, options):
+    """Возвращает ширины и опции миниатюр, из которых собирается srcset.
+
+    Ширины не больше исходной геометрии, пропорции сохраняются. Первыми
+    идут дополнительные форматы, последним — формат по умолчанию.
+    """
+    width, height = (int(size) for size in geometry.split('x'))
+    widths = sorted(
+        {min(size, width) for size in settings.THUMBNAIL_WIDTHS} | {width})
+    formats = [*settings.THUMBNAIL_EXTRA_FORMATS, None]
+    result = []
+    for image_format in formats:
+        for size in widths:
+            variant = dict(options)
+            if image_format:
+                variant['format'] = image_format
+            scaled = f'{size}x{max(1, round(height * size / width))}'
+            result.append((image_format, size, scaled, variant))
+    return result
+
+
+class LookupBackend(ThumbnailBackend):
+    """Бэкенд sorl, который только ищет готовые миниатюры.
+
+    Ключ KV store строится так же, как в ThumbnailBackend.get_thumbnail,
+    но исходник не читается и ничего не нарезается: это дело воркера.
+    Опирается на внутренние методы ThumbnailBackend, поэтому версия
+    sorl-thumbnail закреплена в requirements.txt, а совпадение ключей
+    проверяет test_lookup_finds_thumbnail_of_get_thumbnail.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return default.kvstore.get(ImageFile(name, default.storage))
+
+
+lookup_backend = LookupBackend()
+
+
+def cached_thumbnail(image, geometry, **options):
+    """Готовая миниатюра из KV store sorl или None."""
+    return lookup_backend.get_thumbnail(image, geometry, **options)
+
+
+def generate_renditions(image):
+    """Нарезает все миниатюры одной картинки."""
+    try:
+        with THUMBNAIL_DURATION.time():
+            for geometry, options in settings.THUMBNAIL_RENDITIONS:
+                for _, _, scaled, variant in variants(geometry, options):
+                    get_thumbnail(image, scaled, **variant)
+    except Exception:
+        THUMBNAIL_FAILURES.inc()
+        raise
+    finally:
+        # Поток пула держит своё соединение с базой для KV store sorl.
+        close_old_connections()
+
+
+def claim_jobs(limit):
+    """Берёт в аренду пачку задач, чтобы её не взял другой воркер.
+
+    Задача удаляется только после нарезки (process_jobs). Если воркер
+    упал, аренда истекает через THUMBNAIL_LEASE_SECONDS и задачу берёт
+    следующий; каждая аренда считается попыткой, так что картинка,
+    роняющая воркер, помечается failed, а не крутится в очереди вечно.
+    """
+    now = timezone.now()
+    expired = now - timedelta(seconds=settings.THUMBNAIL_LEASE_SECONDS)
+    with transaction.atomic():
+        stale = ThumbnailJob.objects.filter(
+            failed=False, claimed_at__lt=expired,
+            attempts__gte=settings.THUMBNAIL_MAX_ATTEMPTS)
+        for job in stale:
+            logger.error('Задача миниатюр %s брошена: попытки исчерпаны',
+                         job.image)
+        stale.update(failed=True, claimed_at=None)
+        jobs = ThumbnailJob.objects.filter(
+            Q(claimed_at__isnull=True) | Q(claimed_at__lt=expired),
+            failed=False)
+        if connection.features.has_select_for_update_skip_locked:
+            jobs = jobs.select_for_update(skip_locked=True)
+        jobs = list(jobs[:limit])
+        ThumbnailJob.objects.filter(pk__in=[job.pk for job in jobs]).update(
+            claimed_at=now, attempts=F('attempts') + 1)
+    for job in jobs:
+        job.claimed_at = now
+        job.attempts += 1
+    return jobs
+
+
+def refresh_pages(images):
+    """Сбрасывает страницы постов, которые до нарезки выводили исходник."""
+    posts = Post.objects.filter(image__in=images).select_related(
+        'author', 'group')
+    cache.bump(*{scope for post in posts for scope in post_scopes(post)})
+
+
+def process_jobs(jobs, workers=None):
+    """Выполняет задачи в пуле потоков; возвращает число неудачных."""
+    workers = workers or settings.THUMBNAIL_WORKERS
+    failed = []
+    with ThreadPoolExecutor(
+        max_workers=workers, thread_name_prefix='thumbnails'
+    ) as executor:
+        futures = {
+            executor.submit(generate_renditions, job.image): job
+            for job in jobs
+        }
+        for future, job in futures.items():
+            try:
+                future.result()
+            except Exception:
+                logger.exception('Не удалось нарезать миниатюры %s', job.image)
+                failed.append(job)
+    if len(failed) < len(jobs):
+        refresh_pages([job.image for job in jobs if job not in failed])
+    retry = [
+        job.pk for job in failed
+        if job.attempts < settings.THUMBNAIL_MAX_ATTEMPTS
+    ]
+    ThumbnailJob.objects.filter(pk__in=retry).update(claimed_at=None)
+    ThumbnailJob.objects.filter(
+        pk__in=[job.pk for job in failed if job.pk not in retry]
+    ).update(failed=True, claimed_at=None)
+    ThumbnailJob.objects.filter(
+        pk__in=[job.pk for job in jobs if job not in failed]).delete()
+    return len(failed)
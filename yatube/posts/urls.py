@@ -1,6 +1,8 @@
-from django.urls import path
+from django.urls import path, register_converter
 
-from . import views
+from . import syndication, views
+
+register_converter(syndication.FormatConverter, 'feedformat')
 
 app_name = 'posts'
 
@@ -9,8 +11,27 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name="group_list"),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/followers/',
+         views.follow_list,
+         {'kind': 'followers'},
+         name='followers'),
+    path('profile/<str:username>/following/',
+         views.follow_list,
+         {'kind': 'following'},
+         name='following'),
+    path('profile/<str:username>/mutuals/',
+         views.follow_list,
+         {'kind': 'mutuals'},
+         name='mutuals'),
+    path('search/', views.post_search, name='search'),
     # Просмотр записи
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path('posts/<int:post_id>/comments/',
+         views.post_comments,
+         name='comments'),
+    path('posts/<int:post_id>/comments/<int:comment_id>/',
+         views.comment_thread,
+         name='comment_thread'),
     path('create/', views.post_create, name='create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='edit'),
     path('posts/<int:post_id>/comment/',
@@ -19,10 +40,26 @@ urlpatterns = [
     path('follow/',
          views.follow_index,
          name='follow_index'),
+    path('follow/suggestions/',
+         views.follow_suggestions,
+         name='follow_suggestions'),
     path('profile/<str:username>/follow/',
          views.profile_follow,
          name='profile_follow'),
     path('profile/<str:username>/unfollow/',
          views.profile_unfollow,
          name='profile_unfollow'),
+    # Ленты для программ-агрегаторов: .atom, .rss или .json
+    path('feeds/posts.<feedformat:fmt>',
+         syndication.index_feed,
+         name='index_feed'),
+    path('feeds/group/<slug:slug>.<feedformat:fmt>',
+         syndication.group_feed,
+         name='group_feed'),
+    path('feeds/profile/<str:username>.<feedformat:fmt>',
+         syndication.profile_feed,
+         name='profile_feed'),
+    path('feeds/follow/<str:token>.<feedformat:fmt>',
+         syndication.subscription_feed,
+         name='subscription_feed'),
 ]
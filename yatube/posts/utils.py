@@ -1,9 +1,128 @@
+import base64
+import json
+
 from django.conf import settings
-from django.core.paginator import Paginator
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+from core.instrumentation import view_label
+from core.metrics import PAGE_DEPTH
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+class RawSubquery(RawSQL):
+    """Сырой подзапрос для ``filter(pk__in=...)``.
+
+    RawSQL оборачивает себя в скобки, и lookup in добавляет свои:
+    ``IN ((SELECT ...))`` SQLite понимает как скалярный подзапрос и
+    берёт только первую строку.
+    """
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def encode_cursor(direction, value, pk, number):
+    """Упаковывает позицию страницы в непрозрачный токен для ?cursor=."""
+    payload = json.dumps([direction, value.isoformat(), pk, number])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Распаковывает токен курсора, для испорченного токена вернёт None."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, value, pk, number = json.loads(
+            base64.urlsafe_b64decode(padded.encode()).decode())
+        value = parse_datetime(value)
+        if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or value is None:
+            return None
+        return direction, value, int(pk), max(int(number), 1)
+    except (TypeError, ValueError):
+        return None
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (key, id) вместо OFFSET.
+
+    Страница N стоит столько же, сколько первая: запрос идёт по индексу
+    от позиции, сохранённой в курсоре, и выбирает per_page + 1 строк,
+    чтобы узнать о наличии следующей страницы. COUNT(*) не выполняется,
+    пока кто-нибудь не обратится к ``paginator.count``.
+    """
+
+    def __init__(self, object_list, per_page, key='pub_date'):
+        super().__init__(object_list, per_page)
+        self.key = key
+        self.object_list = object_list.order_by(f'-{key}', '-pk')
+
+    @cached_property
+    def num_pages(self):
+        # Известно только после выборки страницы, см. cursor_page().
+        return 1
+
+    def cursor_page(self, cursor=None):
+        position = decode_cursor(cursor) if cursor else None
+        if position is None:
+            direction, number = CURSOR_NEXT, 1
+            queryset = self.object_list
+        else:
+            direction, value, pk, number = position
+            queryset = self._seek(direction, value, pk)
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if direction == CURSOR_PREVIOUS:
+            rows.reverse()
+            has_next = True
+        else:
+            has_next = has_more
+        # Page.has_next() сравнивает номер страницы с num_pages.
+        self.num_pages = number + 1 if has_next else number
+        page = Page(rows, number, self)
+        page.next_cursor = None
+        page.previous_cursor = None
+        if has_next and rows:
+            page.next_cursor = self._cursor(CURSOR_NEXT, rows[-1], number + 1)
+        if number > 1 and rows:
+            page.previous_cursor = self._cursor(
+                CURSOR_PREVIOUS, rows[0], number - 1)
+        return page
+
+    def _seek(self, direction, value, pk):
+        key = self.key
+        if direction == CURSOR_NEXT:
+            return self.object_list.filter(
+                Q(**{f'{key}__lt': value}) | Q(**{key: value, 'pk__lt': pk}))
+        return self.object_list.filter(
+            Q(**{f'{key}__gt': value}) | Q(**{key: value, 'pk__gt': pk})
+        ).order_by(key, 'pk')
+
+    def _cursor(self, direction, obj, number):
+        if isinstance(obj, dict):
+            # Строки values(): ключ и pk должны быть среди колонок.
+            return encode_cursor(direction, obj[self.key], obj['pk'], number)
+        return encode_cursor(direction, getattr(obj, self.key), obj.pk, number)
+
 
+def paginator_def(request, posts, key='pub_date'):
+    """Страница постов для шаблона.
 
-def paginator_def(request, posts):
-    paginator = Paginator(posts, settings.NUMBER_POST)
+    Ссылки паджинатора передают ``?cursor=``; старые ссылки ``?page=N``
+    продолжают работать через обычный Paginator.
+    """
     page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    return page_obj
+    if page_number is not None and 'cursor' not in request.GET:
+        paginator = Paginator(posts, settings.NUMBER_POST)
+        page = paginator.get_page(page_number)
+    else:
+        paginator = CursorPaginator(posts, settings.NUMBER_POST, key=key)
+        page = paginator.cursor_page(request.GET.get('cursor'))
+    PAGE_DEPTH.labels(view_label(request) or 'unresolved').observe(
+        page.number)
+    return page
@@ -0,0 +1,75 @@
+"""Кто смотрит страницу: один объект на запрос, request.viewer.
+
+Views и шаблоны спрашивают у него «это мой пост?» и «я подписан на
+автора?» вместо сравнения пользователей и запросов к Follow. Всё
+вычисляется при первом обращении и запоминается до конца запроса:
+id авторов, на которых подписан зритель, читаются одним запросом на
+весь запрос, сколько бы постов и include ни было на странице.
+"""
+from django.utils.functional import cached_property
+
+from .models import Follow
+
+
+class Viewer:
+    def __init__(self, request):
+        self._request = request
+
+    @cached_property
+    def user(self):
+        return self._request.user
+
+    @cached_property
+    def id(self):
+        # Только pk: сравнение пользователей обходится без их загрузки.
+        return self.user.pk if self.user.is_authenticated else None
+
+    @property
+    def is_authenticated(self):
+        return self.id is not None
+
+    @cached_property
+    def followed_ids(self):
+        # Для страниц со многими кнопками подписки; одну кнопку дешевле
+        # проверить exists() по unique_follow, как в profile.
+        if not self.is_authenticated:
+            return frozenset()
+        return frozenset(Follow.objects.filter(user_id=self.id).values_list(
+            'author_id', flat=True))
+
+    def is_self(self, user):
+        return self.is_authenticated and _pk(user) == self.id
+
+    def owns(self, obj):
+        """Автор ли зритель поста или комментария."""
+        return self.is_authenticated and obj.author_id == self.id
+
+    def follows(self, author):
+        return _pk(author) in self.followed_ids
+
+
+def _pk(user):
+    return getattr(user, 'pk', user)
+
+
+def get_viewer(request):
+    viewer = getattr(request, 'viewer', None)
+    if viewer is None:
+        viewer = request.viewer = Viewer(request)
+    return viewer
+
+
+class ViewerMiddleware:
+    """Ставит request.viewer; подключается после AuthenticationMiddleware."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.viewer = Viewer(request)
+        return self.get_response(request)
+
+
+def viewer(request):
+    """Контекстный процессор: переменная viewer в шаблонах."""
+    return {'viewer': get_viewer(request)}
@@ -1,17 +1,23 @@
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.core.cache import cache
 from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
-
+from . import graph, search, syndication, threads, thumbnails
+from .cache import cache_versioned, conditional_versioned
+from .feed import follow_feed
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
-from .utils import paginator_def
+from .models import Comment, Follow, Group, Post, User, UserStats
+from .utils import CursorPaginator, paginator_def
+from .viewer import get_viewer
 
 
-@cache_page(20)
+@conditional_versioned('feed')
+@cache_versioned('feed')
 def index(request):
-    posts = Post.objects.all()
+    posts = Post.objects.feed()
     # Отдаем в словаре контекста
     context = {
         'page_obj': paginator_def(request, posts),
@@ -19,38 +25,71 @@ def index(request):
     return render(request, 'posts/index.html', context)
 
 
+@conditional_versioned('group:{slug}')
+@cache_versioned('group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.select_related('group')
+    posts = group.posts.feed()
     template = 'posts/group_list.html'
     context = {'group': group, 'page_obj': paginator_def(request, posts)}
     return render(request, template, context)
 
 
+@conditional_versioned('author:{username}')
+@cache_versioned('author:{username}')
 def profile(request, username, following=False):
     author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
+    posts = author.posts.feed()
     template = 'posts/profile.html'
-    following_button = False
-    following = request.user.is_authenticated and Follow.objects.filter(
-        author=author,
-        user=request.user).exists()
-    if author != request.user:
-        following_button = True
+    stats = UserStats.for_user(author)
+    viewer = get_viewer(request)
+    # Для одной кнопки хватает одного запроса по индексу, без
+    # viewer.followed_ids со всеми подписками зрителя.
+    following = viewer.is_authenticated and Follow.objects.filter(
+        user_id=viewer.id, author=author).exists()
     context = {
         'page_obj': paginator_def(request, posts),
+        'posts_count': stats.posts_count,
+        'author_stats': stats,
         'author': author,
         'following': following,
-        'following_button': following_button}
+        'following_button': not viewer.is_self(author)}
     return render(request, template, context)
 
 
+POST_AUTHOR_KEY = 'post_author:{}'
+
+
+def post_author_scope(post_id, **kwargs):
+    """Область автора поста: на странице поста видно число его постов.
+
+    Автор у поста не меняется, поэтому его имя запоминается в кэше без
+    срока, и проверка кэша обычно обходится без запроса к базе.
+    """
+    key = POST_AUTHOR_KEY.format(post_id)
+    username = cache.get(key)
+    if username is None:
+        username = Post.objects.filter(pk=post_id).values_list(
+            'author__username', flat=True).first()
+        if username is None:
+            # Поста нет, view ответит 404.
+            return f'post:{post_id}'
+        cache.set(key, username, None)
+    return f'author:{username}'
+
+
+POST_SCOPES = ('post:{post_id}', post_author_scope)
+
+
+@conditional_versioned(*POST_SCOPES)
+@cache_versioned(*POST_SCOPES)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id)
     title = str(post.text)[:settings.LIMIT_TEXT]
-    number_of_posts = Post.objects.filter(author=post.author).count()
+    number_of_posts = UserStats.for_user(post.author).posts_count
     form = CommentForm()
-    comments = Comment.objects.filter(post=post)
+    comments = comment_page(request, post.pk)
     context = {
         'post': post,
         'title': title,
@@ -61,6 +100,96 @@ def post_detail(request, post_id):
     return render(request, 'posts/post_detail.html', context)
 
 
+def comment_page(request, post_id):
+    """Страница веток комментариев по курсору ?cursor=, новые первыми.
+
+    У каждого корня ветки — первые ответы (threads.attach_replies).
+    """
+    comments = threads.with_reply_counts(
+        Comment.objects.filter(post_id=post_id, depth=0).select_related(
+            'author').only('text', 'pub_date', 'post', 'author__username'))
+    paginator = CursorPaginator(comments, settings.COMMENTS_PER_PAGE)
+    page = paginator.cursor_page(request.GET.get('cursor'))
+    threads.attach_replies(page.object_list)
+    return page
+
+
+def comment_json(comment):
+    return {
+        'id': comment.pk,
+        'author': comment.author.username,
+        'text': comment.text,
+        'pub_date': comment.pub_date,
+    }
+
+
+@conditional_versioned(*POST_SCOPES)
+@cache_versioned(*POST_SCOPES)
+def post_comments(request, post_id):
+    """Следующая страница комментариев: HTML-фрагмент или ?format=json."""
+    get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    comments = comment_page(request, post_id)
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [
+                {
+                    **comment_json(comment),
+                    'replies': [
+                        {**comment_json(reply), 'depth': reply.depth}
+                        for reply in comment.replies
+                    ],
+                    'hidden_replies': comment.hidden_replies,
+                }
+                for comment in comments
+            ],
+            'next_cursor': comments.next_cursor,
+        }, json_dumps_params={'ensure_ascii': False})
+    context = {'post_id': post_id, 'comments': comments}
+    return render(request, 'posts/includes/comments.html', context)
+
+
+@conditional_versioned(*POST_SCOPES)
+@cache_versioned(*POST_SCOPES)
+def comment_thread(request, post_id, comment_id):
+    """Ветка ответов под комментарием, страницами по ?after=."""
+    comment = get_object_or_404(
+        Comment.objects.select_related('author', 'post'),
+        pk=comment_id, post_id=post_id)
+    replies, next_after = threads.thread_page(
+        comment, request.GET.get('after'))
+    context = {
+        'comment': comment,
+        'replies': replies,
+        'next_after': next_after,
+        'form': CommentForm(),
+    }
+    return render(request, 'posts/comment_thread.html', context)
+
+
+@conditional_versioned('feed')
+@cache_versioned('feed')
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    group = author = None
+    if request.GET.get('group'):
+        group = get_object_or_404(Group, slug=request.GET['group'])
+    if request.GET.get('author'):
+        author = get_object_or_404(User, username=request.GET['author'])
+    results = search.search(query, group=group, author=author) if query else []
+    paginator = Paginator(results, settings.NUMBER_POST)
+    # Ссылки паджинатора должны сохранять запрос и фильтры.
+    params = request.GET.copy()
+    params.pop('page', None)
+    context = {
+        'query': query,
+        'group': group,
+        'author': author,
+        'page_obj': paginator.get_page(request.GET.get('page')),
+        'page_query': params.urlencode() + '&' if params else '',
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -70,6 +199,8 @@ def post_create(request):
         create_post = form.save(commit=False)
         create_post.author = request.user
         create_post.save()
+        if create_post.image:
+            thumbnails.enqueue(create_post.image)
         return redirect('posts:profile', create_post.author)
     template = 'posts/create_post.html'
     context = {'form': form}
@@ -78,7 +209,7 @@ def post_create(request):
 
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
-    if post.author != request.user:
+    if not get_viewer(request).owns(post):
         return redirect('posts:post_detail', post_id=post_id)
 
     form = PostForm(
@@ -87,7 +218,9 @@ def post_edit(request, post_id):
         instance=post
     )
     if form.is_valid():
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data and post.image:
+            thumbnails.enqueue(post.image)
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'post': post,
@@ -107,7 +240,16 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        # Ответ: id комментария приходит скрытым полем parent.
+        parent_id = request.POST.get('parent', '')
+        if parent_id.isdigit():
+            parent = get_object_or_404(Comment, pk=parent_id, post=post)
+            comment.parent = threads.reply_parent(parent)
         comment.save()
+        if comment.parent_id is not None:
+            return redirect(
+                'posts:comment_thread', post_id=post_id,
+                comment_id=comment.root_id)
     return redirect('posts:post_detail', post_id=post_id)
 
 
@@ -115,33 +257,62 @@ def add_comment(request, post_id):
 def follow_index(request):
     template = 'posts/follow.html'
     title = 'Все посты ваших подписок'
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, settings.NUMBER_POST)
-    page_number = request.GET.get('page_obj')
-    page_obj = paginator.get_page(page_number)
+    posts, key = follow_feed(request.user)
     context = {
         'title': title,
-        'page_obj': page_obj
+        'page_obj': paginator_def(request, posts, key=key),
+        'feed_token': syndication.follow_token(request.user),
     }
     return render(request, template, context)
 
 
+FOLLOW_LISTS = {
+    'followers': ('Подписчики', graph.followers, 'user'),
+    'following': ('Подписки', graph.following, 'author'),
+    'mutuals': ('Взаимные подписки', graph.mutuals, 'author'),
+}
+
+
+def follow_list(request, username, kind):
+    """Подписчики, подписки или взаимные подписки автора по курсору."""
+    author = get_object_or_404(User, username=username)
+    title, follows, side = FOLLOW_LISTS[kind]
+    page = graph.page(follows(author), request.GET.get('cursor'))
+    context = {
+        'author': author,
+        'title': title,
+        'kind': kind,
+        'page_obj': page,
+        'users': [getattr(follow, side) for follow in page],
+    }
+    return render(request, 'posts/follow_list.html', context)
+
+
+@login_required
+def follow_suggestions(request):
+    context = {
+        'title': 'Кого почитать',
+        'suggestions': graph.suggestions(request.user),
+    }
+    return render(request, 'posts/follow_suggestions.html', context)
+
+
 @login_required
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
-    following_exists = Follow.objects.filter(
-        author=author,
-        user=request.user).exists()
-    user_author = request.user != author
-    if user_author and (request.user != author and not following_exists):
-        Follow.objects.create(
-            user=request.user,
-            author=author)
+    if request.user != author:
+        # Повторную подписку отсекает ограничение unique_follow, поэтому
+        # заранее проверять exists() не нужно.
+        try:
+            with transaction.atomic():
+                Follow.objects.create(user=request.user, author=author)
+        except IntegrityError:
+            pass
     return redirect('posts:profile', username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.get(user=request.user, author=author).delete()
+    Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username)
@@ -45,15 +45,19 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.db.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'posts.viewer.ViewerMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -63,7 +67,7 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -73,6 +77,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'posts.viewer.viewer',
             ],
         },
     },
@@ -88,9 +93,40 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Постоянные соединения вместо нового на каждый запрос.
+        'CONN_MAX_AGE': int(os.environ.get('YATUBE_DB_CONN_MAX_AGE', 60)),
     }
 }
 
+# PRAGMA для каждого нового соединения с SQLite, см. core.sqlite.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+    'wal_autocheckpoint': 1000,
+}
+
+# Реплики только для чтения, через запятую: YATUBE_DB_REPLICAS=a.db,b.db.
+# В тестах они зеркалят default. Маршрутизацию делает core.db.
+for number, name in enumerate(
+    filter(None, os.environ.get('YATUBE_DB_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.db.PrimaryReplicaRouter']
+# Сколько секунд после своей записи пользователь читает из default. Столько
+# же после сдвига поколения области страницы для кэша рендерятся из
+# default (posts.cache): это допустимое отставание реплик.
+REPLICA_PIN_SECONDS = 10
+REPLICA_HEALTH_CHECK_INTERVAL = 30
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -137,6 +173,16 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 NUMBER_POST = 10
+COMMENTS_PER_PAGE = 20
+# Ветки комментариев (posts.threads): наибольшая глубина ответов, сколько
+# ответов и до какой глубины показывать под комментарием в посте.
+COMMENT_MAX_DEPTH = 5
+COMMENT_PREVIEW_REPLIES = 3
+COMMENT_PREVIEW_DEPTH = 2
+# Граф подписок (posts.graph): размер страницы списков подписчиков и число
+# рекомендаций на пользователя (их пересчитывает recompute_suggestions).
+FOLLOWS_PER_PAGE = 30
+FOLLOW_SUGGESTIONS = 20
 LIMIT_TEXT = 15
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
@@ -145,8 +191,95 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 upload_to = 'posts/'
 
-CACHES = {
-    'default': {
+# Бэкенд кэша выбирается переменной окружения YATUBE_CACHE. LocMemCache
+# у каждого воркера свой; для нескольких воркеров на одном сервере нужен
+# sqlite, для нескольких серверов — memcached (пакет python-memcached).
+# FileBasedCache не подходит: в нём нет атомарного incr для счётчиков
+# поколений posts.cache.
+CACHE_LOCATION = os.environ.get(
+    'YATUBE_CACHE_LOCATION', os.path.join(BASE_DIR, 'cache', 'cache.sqlite3'))
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'sqlite': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': CACHE_LOCATION,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.environ.get('YATUBE_CACHE_MAX_ENTRIES', 10000)),
+            'COMPRESS_MIN_LENGTH': 1024,
+        },
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': os.environ.get('YATUBE_CACHE_LOCATION', '127.0.0.1:11211'),
+    },
+}
+CACHES = {
+    'default': CACHE_BACKENDS[os.environ.get('YATUBE_CACHE', 'locmem')],
+}
+# Страницы сбрасываются по поколениям (posts.cache), срок жизни — запасной.
+PAGE_CACHE_TIMEOUT = 60 * 60
+# Карточки постов в списках (posts.cards) тоже версионируются поколениями
+# и переживают сброс страниц, поэтому живут дольше.
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Материализованная лента подписок (posts.feed): посты раскладываются
+# по лентам подписчиков при публикации. Авторы, у которых подписчиков
+# больше FEED_FANOUT_LIMIT, читаются из Post при запросе ленты. После
+# смены FEED_FANOUT_LIMIT ленты нужно собрать заново: posts.feed.rebuild().
+FEED_MATERIALIZED = True
+FEED_FANOUT_LIMIT = 1000
+
+# JSON API (api): размер страницы по умолчанию, наибольший ?limit= и
+# наибольшее число объектов в одном пакетном запросе.
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+API_BATCH_LIMIT = 500
+
+# Ленты Atom/RSS/JSON (posts.syndication): число постов и длина заголовка.
+SYNDICATION_ITEMS = 50
+SYNDICATION_TITLE_LENGTH = 80
+
+# Миниатюры, которые шаблоны запрашивают через {% thumbnail %}. Их заранее
+# нарезает manage.py thumbnail_worker (см. posts.thumbnails).
+THUMBNAIL_RENDITIONS = [
+    ('960x339', {'crop': 'center', 'upscale': True}),
+    ('1960x339', {'crop': 'center', 'upscale': True}),
+    ('1960x1000', {'crop': 'center', 'upscale': True}),
+]
+# Ширины для srcset: каждая миниатюра нарезается ещё и в ширинах поуже,
+# а кроме формата по умолчанию — в WebP.
+THUMBNAIL_WIDTHS = (480, 960, 1960)
+THUMBNAIL_EXTRA_FORMATS = ('WEBP',)
+THUMBNAIL_WORKERS = 4
+THUMBNAIL_MAX_ATTEMPTS = 3
+# Сколько секунд задача считается занятой воркером: если он упал, не
+# закончив пачку, задачи снова берутся в работу после этого срока.
+THUMBNAIL_LEASE_SECONDS = 10 * 60
+
+# Метрики запросов (core.middleware.RequestMetricsMiddleware): доля
+# запросов, для которых пишутся все SQL, и порог медленного запроса.
+REQUEST_METRICS_SAMPLE_RATE = 1.0 if DEBUG else 0.05
+REQUEST_METRICS_SERVER_TIMING = True
+SLOW_REQUEST_THRESHOLD_MS = 500
+
+# Адреса, с которых Prometheus забирает /metrics (см. core.metrics).
+METRICS_ALLOWED_IPS = ['127.0.0.1']
+
+# Строка лога на каждый запрос пишется на уровне INFO, медленные
+# запросы — на WARNING.
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('YATUBE_REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
 }